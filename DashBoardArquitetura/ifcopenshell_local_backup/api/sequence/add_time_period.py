@@ -86,5 +86,6 @@ def add_time_period(
 
     ifcopenshell.util.sequence.is_working_day.cache_clear()
     ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+    ifcopenshell.util.sequence.compile_calendar.cache_clear()
 
     return time_period
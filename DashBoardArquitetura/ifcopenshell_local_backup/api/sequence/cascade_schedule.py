@@ -111,6 +111,8 @@ class Usecase:
 
     def execute(self, task: ifcopenshell.entity_instance):
         self.calendar_cache = {}
+        # Calendars may have been edited since the last run, so compile them afresh
+        ifcopenshell.util.sequence.compile_calendar.cache_clear()
         self.cascade_task(task, is_first_task=True)
 
     def cascade_task(
@@ -57,3 +57,4 @@ def edit_recurrence_pattern(
 
     ifcopenshell.util.sequence.is_working_day.cache_clear()
     ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+    ifcopenshell.util.sequence.compile_calendar.cache_clear()
@@ -17,13 +17,21 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import heapq
 import networkx as nx
 import ifcopenshell.api.sequence
 import ifcopenshell.util.date
 import ifcopenshell.util.sequence
+from collections.abc import Iterable, Iterator
+from typing import Optional, Union
 
 
-def recalculate_schedule(file: ifcopenshell.file, work_schedule: ifcopenshell.entity_instance) -> None:
+def recalculate_schedule(
+    file: ifcopenshell.file,
+    work_schedule: ifcopenshell.entity_instance,
+    schedule_graph: Optional["ScheduleGraph"] = None,
+    tasks: Optional[list[ifcopenshell.entity_instance]] = None,
+) -> "ScheduleGraph":
     """Calculate the critical path and floats for a work schedule
 
     This implements critical path analysis, using the forward pass and
@@ -34,8 +42,20 @@ def recalculate_schedule(file: ifcopenshell.file, work_schedule: ifcopenshell.en
     Cyclical relationships are detected and will result in a recursion
     error.
 
+    The task network is returned so that it may be reused. After editing a
+    few tasks, pass it back along with the edited tasks and only the tasks
+    upstream or downstream of the edits are recalculated, and only task
+    times that changed are written. If tasks are omitted, every task is
+    reread, which is also required after tasks are removed.
+
     :param work_schedule: The IfcWorkSchedule to perform the calculation on.
-    :return: None
+    :param schedule_graph: The network returned by a previous calculation
+        of the same work schedule. If omitted, the network is built and
+        calculated from scratch.
+    :param tasks: The IfcTasks edited since the previous calculation,
+        including tasks whose durations, calendars, start dates, sequences
+        or lag times changed. Summary tasks stand for all of their subtasks.
+    :return: The network of the work schedule.
 
     Example:
 
@@ -45,157 +65,312 @@ def recalculate_schedule(file: ifcopenshell.file, work_schedule: ifcopenshell.en
         # details of how to set up a basic set of tasks and calculate the
         # critical path. Typically cascade_schedule is run prior to ensure
         # that dates are correct.
+        graph = ifcopenshell.api.sequence.recalculate_schedule(model, work_schedule=schedule)
+
+        # Later, after changing the duration of a single task
+        ifcopenshell.api.sequence.edit_task_time(model, task_time=task.TaskTime, attributes={"ScheduleDuration": "P5D"})
+        ifcopenshell.api.sequence.recalculate_schedule(
+            model, work_schedule=schedule, schedule_graph=graph, tasks=[task])
     """
     usecase = Usecase()
     usecase.file = file
-    return usecase.execute(work_schedule)
+    return usecase.execute(work_schedule, schedule_graph, tasks)
 
 
 class Usecase:
     file: ifcopenshell.file
 
-    def execute(self, work_schedule: ifcopenshell.entity_instance) -> None:
-        self.work_schedule = work_schedule
-        # The method implemented is the same as shown here:
-        # https://www.youtube.com/watch?v=qTErIV6OqLg
-        self.start_dates = []
-        self.build_network_graph()
+    def execute(
+        self,
+        work_schedule: ifcopenshell.entity_instance,
+        schedule_graph: Optional["ScheduleGraph"],
+        tasks: Optional[list[ifcopenshell.entity_instance]],
+    ) -> "ScheduleGraph":
+        # Calendars may have been edited since the last run, so compile them afresh
+        ifcopenshell.util.sequence.compile_calendar.cache_clear()
+        if (
+            schedule_graph is None
+            or schedule_graph.file is not self.file
+            or schedule_graph.work_schedule != work_schedule
+        ):
+            schedule_graph = ScheduleGraph(self.file, work_schedule)
+            nodes = schedule_graph.calculate()
+        else:
+            nodes = schedule_graph.update(tasks)
+        self.update_task_times(schedule_graph, nodes)
+        return schedule_graph
 
-        if not self.start_dates:
-            return
+    def update_task_times(self, schedule_graph: "ScheduleGraph", nodes: Iterable[Union[int, str]]) -> None:
+        for ifc_definition_id in nodes:
+            if ifc_definition_id in ("start", "finish"):
+                continue
+            data = schedule_graph.g.nodes[ifc_definition_id]
+            task = self.file.by_id(ifc_definition_id)
+            if not task.TaskTime:
+                continue
+            ifcopenshell.api.sequence.edit_task_time(
+                self.file,
+                task_time=task.TaskTime,
+                attributes={
+                    "FreeFloat": ifcopenshell.util.date.datetime2ifc(data["free_float"], "IfcDuration"),
+                    "TotalFloat": ifcopenshell.util.date.datetime2ifc(data["total_float"], "IfcDuration"),
+                    "IsCritical": data["total_float"].days == 0,
+                    "EarlyStart": ifcopenshell.util.date.datetime2ifc(data["early_start"], "IfcDateTime"),
+                    "EarlyFinish": ifcopenshell.util.date.datetime2ifc(data["early_finish"], "IfcDateTime"),
+                    "LateStart": ifcopenshell.util.date.datetime2ifc(data["late_start"], "IfcDateTime"),
+                    "LateFinish": ifcopenshell.util.date.datetime2ifc(data["late_finish"], "IfcDateTime"),
+                },
+            )
 
-        is_cyclic = False
-        attempts = 0
-        self.pending_nodes = set(self.g.nodes)
-        max_worst_case_attempts = pow(len(self.pending_nodes), 2)
-        while self.pending_nodes:
-            attempts += 1
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.forward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
-
-            # As we parse nodes, the remaining attempts can drop dramatically, so we recalculate the upper limit
-            max_remaining_attempts = pow(len(self.pending_nodes), 2)
-            if max_remaining_attempts < max_worst_case_attempts:
-                max_worst_case_attempts = max_remaining_attempts
-                attempts = 0
-
-            if attempts > max_worst_case_attempts:
-                is_cyclic = True
-                break  # We have an infinite loop due to a cyclic graph
-
-        if is_cyclic:
-            raise RecursionError("Task graph is cyclic and so critical path method cannot be performed.")
-
-        self.pending_nodes = set(self.g.nodes)
-        while self.pending_nodes:
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.backward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
-
-        self.update_task_times()
-
-    def build_network_graph(self) -> None:
-        self.sequence_type_map = {
-            None: "FS",
-            "START_START": "SS",
-            "START_FINISH": "SF",
-            "FINISH_START": "FS",
-            "FINISH_FINISH": "FF",
-            "USERDEFINED": "FS",
-            "NOTDEFINED": "FS",
-        }
+
+class ScheduleGraph:
+    """The task network of a work schedule, kept between calculations
+
+    Each task without subtasks is a node, connected by its sequences, with
+    two extra nodes for the start and finish of the whole schedule. The
+    method implemented is the same as shown here:
+    https://www.youtube.com/watch?v=qTErIV6OqLg
+
+    Nodes are passed forwards and backwards in topological order, which is
+    cached until the sequences change. Updates only revisit nodes whose
+    inputs changed, and stop propagating at nodes whose dates are the same
+    as before.
+    """
+
+    sequence_type_map = {
+        None: "FS",
+        "START_START": "SS",
+        "START_FINISH": "SF",
+        "FINISH_START": "FS",
+        "FINISH_FINISH": "FF",
+        "USERDEFINED": "FS",
+        "NOTDEFINED": "FS",
+    }
+
+    def __init__(self, file: ifcopenshell.file, work_schedule: ifcopenshell.entity_instance):
+        self.file = file
+        self.work_schedule = work_schedule
         self.g = nx.DiGraph()
-        self.edges = []
         self.g.add_node("start", duration=0, duration_type="ELAPSEDTIME", calendar=None)
         self.g.add_node("finish", duration=0, duration_type="ELAPSEDTIME", calendar=None)
+        # Tasks without predecessors that are constrained to start on a date
+        self.start_dates: dict[int, datetime.datetime] = {}
+        # Calculated dates and floats of each node, as last returned to be written
+        self.results: dict[Union[int, str], tuple] = {}
+        self.order: Optional[dict[Union[int, str], int]] = None
+        self.is_calculated = False
+        for task in self.get_tasks():
+            self.set_node(task)
+
+    def get_tasks(self) -> Iterator[ifcopenshell.entity_instance]:
         for rel in self.work_schedule.Controls:
             for related_object in rel.RelatedObjects:
-                if not related_object.is_a("IfcTask"):
-                    continue
-                self.add_node(related_object)
-        self.g.add_edges_from(self.edges)
+                if related_object.is_a("IfcTask"):
+                    yield from self.get_leaf_tasks(related_object)
 
-    def add_node(self, task: ifcopenshell.entity_instance) -> None:
+    def get_leaf_tasks(self, task: ifcopenshell.entity_instance) -> Iterator[ifcopenshell.entity_instance]:
         if task.IsNestedBy:
             for rel in task.IsNestedBy:
-                [self.add_node(o) for o in rel.RelatedObjects]
+                for related_object in rel.RelatedObjects:
+                    yield from self.get_leaf_tasks(related_object)
             return
+        yield task
 
+    def set_node(self, task: ifcopenshell.entity_instance) -> bool:
+        """Reads a task into its node and incoming edges, returning whether anything changed"""
         if task.TaskTime and task.TaskTime.ScheduleDuration:
             duration = ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleDuration).days
             duration_type = task.TaskTime.DurationType
         else:
             duration = 0
             duration_type = "ELAPSEDTIME"
+        attributes = {
+            "duration": duration,
+            "duration_type": duration_type,
+            "calendar": ifcopenshell.util.sequence.derive_calendar(task),
+        }
 
-        self.g.add_node(
-            task.id(),
-            duration=duration,
-            duration_type=duration_type,
-            calendar=ifcopenshell.util.sequence.derive_calendar(task),
-        )
-
-        self.edges.extend(
-            [
-                (
-                    rel.RelatingProcess.id(),
-                    task.id(),
-                    {
-                        "lag_time": (
-                            0
-                            if not rel.TimeLag
-                            else ifcopenshell.util.date.ifc2datetime(rel.TimeLag.LagValue.wrappedValue).days
-                        ),
-                        "type": self.sequence_type_map[rel.SequenceType],
-                    },
-                )
-                for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, sequence="predecessor")
-            ]
-        )
-
-        predecessor_types = [
-            rel.SequenceType for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, "predecessor")
-        ]
-        successor_types = [
-            rel.SequenceType for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, "successor")
-        ]
-
-        if not predecessor_types:
-            self.edges.append(("start", task.id(), {"lag_time": 0, "type": "FS"}))
+        predecessors = {
+            rel.RelatingProcess.id(): {
+                "lag_time": self.get_lag_time(rel),
+                "type": self.sequence_type_map[rel.SequenceType],
+            }
+            for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, sequence="predecessor")
+        }
+        start_date = None
+        if not predecessors:
+            predecessors["start"] = {"lag_time": 0, "type": "FS"}
             if task.TaskTime and task.TaskTime.ScheduleStart:
-                self.start_dates.append(ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleStart))
-                self.g.nodes[task.id()]["early_start"] = ifcopenshell.util.date.ifc2datetime(
-                    task.TaskTime.ScheduleStart
-                )  # we assume this task is constrained to start on this date
-        if not successor_types:
-            self.edges.append((task.id(), "finish", {"lag_time": 0, "type": "FF"}))
-
-    def update_task_times(self) -> None:
-        for ifc_definition_id in self.g.nodes:
-            if ifc_definition_id in ("start", "finish"):
+                # we assume this task is constrained to start on this date
+                start_date = ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleStart)
+        is_last = not ifcopenshell.util.sequence.get_sequence_assignment(task, "successor")
+
+        node = task.id()
+        is_changed = node not in self.g or self.start_dates.get(node) != start_date
+        is_changed = is_changed or any(self.g.nodes[node].get(k) != v for k, v in attributes.items())
+        self.g.add_node(node, **attributes)
+        if start_date:
+            self.start_dates[node] = start_date
+        else:
+            self.start_dates.pop(node, None)
+
+        edges = {predecessor: self.g[predecessor][node] for predecessor in self.g.predecessors(node)}
+        if edges != predecessors or self.g.has_edge(node, "finish") != is_last:
+            is_changed = True
+            self.order = None
+            self.g.remove_edges_from([(predecessor, node) for predecessor in edges])
+            self.g.add_edges_from([(predecessor, node, edge) for predecessor, edge in predecessors.items()])
+            if is_last:
+                self.g.add_edge(node, "finish", lag_time=0, type="FF")
+            elif self.g.has_edge(node, "finish"):
+                self.g.remove_edge(node, "finish")
+        return is_changed
+
+    def get_lag_time(self, rel: ifcopenshell.entity_instance) -> int:
+        if not rel.TimeLag:
+            return 0
+        return ifcopenshell.util.date.ifc2datetime(rel.TimeLag.LagValue.wrappedValue).days
+
+    def get_order(self) -> dict[Union[int, str], int]:
+        if self.order is None:
+            try:
+                self.order = {node: i for i, node in enumerate(nx.topological_sort(self.g))}
+            except nx.NetworkXUnfeasible:
+                raise RecursionError("Task graph is cyclic and so critical path method cannot be performed.")
+        return self.order
+
+    def calculate(self) -> set[Union[int, str]]:
+        """Calculates every node, returning the nodes to be written"""
+        self.results = {}
+        self.is_calculated = False
+        if not self.start_dates:
+            return set()
+        self.forward(set(self.g.nodes))
+        self.backward(set(self.g.nodes))
+        self.is_calculated = True
+        return set(self.g.nodes)
+
+    def update(self, tasks: Optional[list[ifcopenshell.entity_instance]] = None) -> set[Union[int, str]]:
+        """Rereads edited tasks and recalculates the nodes they affect
+
+        :param tasks: The edited tasks. If omitted, every task is reread and
+            removed tasks are dropped from the network.
+        :return: The nodes whose dates or floats changed.
+        """
+        forward_nodes = set()
+        backward_nodes = set()
+        if tasks is None:
+            tasks = list(self.get_tasks())
+            nodes = {task.id() for task in tasks}
+            for node in [n for n in self.g.nodes if n not in nodes and n not in ("start", "finish")]:
+                forward_nodes.update(self.g.successors(node))
+                backward_nodes.update(self.g.predecessors(node))
+                self.g.remove_node(node)
+                self.start_dates.pop(node, None)
+                self.results.pop(node, None)
+                self.order = None
+        else:
+            tasks = [leaf_task for task in tasks for leaf_task in self.get_leaf_tasks(task)]
+
+        # Sequences are read from the successor's side, so neighbours are reread too
+        neighbours = {}
+        for task in tasks:
+            for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, "predecessor"):
+                neighbours[rel.RelatingProcess.id()] = rel.RelatingProcess
+            for rel in ifcopenshell.util.sequence.get_sequence_assignment(task, "successor"):
+                neighbours[rel.RelatedProcess.id()] = rel.RelatedProcess
+            if (node := task.id()) in self.g:
+                for neighbour in (*self.g.predecessors(node), *self.g.successors(node)):
+                    if neighbour not in ("start", "finish"):
+                        neighbours[neighbour] = self.file.by_id(neighbour)
+        for task in tasks:
+            neighbours.pop(task.id(), None)
+        # Only tasks of this schedule are nodes, other processes only appear at the ends of edges
+        neighbour_tasks = [task for node, task in neighbours.items() if "duration" in self.g.nodes.get(node, ())]
+
+        edited_nodes = {task.id() for task in tasks}
+        for task in tasks + neighbour_tasks:
+            node = task.id()
+            # Neighbours from before and after the edit are both affected
+            predecessors = list(self.g.predecessors(node)) if node in self.g else []
+            successors = list(self.g.successors(node)) if node in self.g else []
+            # An edited calendar is still the same instance and compares equal,
+            # so edited tasks are always recalculated and only neighbours are
+            # skipped when their node is unchanged
+            if not self.set_node(task) and node not in edited_nodes:
                 continue
-            data = self.g.nodes[ifc_definition_id]
-            task = self.file.by_id(ifc_definition_id)
-            if not task.TaskTime:
+            forward_nodes.update((node, "start", *successors, *self.g.successors(node)))
+            backward_nodes.update((node, *predecessors, *self.g.predecessors(node)))
+
+        if not self.is_calculated:
+            return self.calculate()
+        if not self.start_dates:
+            self.results = {}
+            self.is_calculated = False
+            return set()
+        try:
+            for node in self.forward(forward_nodes):
+                backward_nodes.add(node)
+                backward_nodes.update(self.g.predecessors(node))
+            return self.backward(backward_nodes)
+        except RecursionError:
+            # What was reread is no longer known to be dirty, so start afresh next time
+            self.is_calculated = False
+            raise
+
+    def forward(self, nodes: set[Union[int, str]]) -> set[Union[int, str]]:
+        """Runs the forward pass from the nodes onwards, returning nodes whose early dates changed"""
+        order = self.get_order()
+        queue = [(order[node], node) for node in nodes if node in order]
+        heapq.heapify(queue)
+        queued = {node for _, node in queue}
+        changed = set()
+        while queue:
+            node = heapq.heappop(queue)[1]
+            data = self.g.nodes[node]
+            before = (data.get("early_start"), data.get("early_finish"))
+            data["early_start"] = self.start_dates.get(node)
+            data.pop("early_finish", None)
+            if not self.forward_pass(node):
+                raise RecursionError("Task graph is cyclic and so critical path method cannot be performed.")
+            if (data["early_start"], data["early_finish"]) == before:
                 continue
-            ifcopenshell.api.sequence.edit_task_time(
-                self.file,
-                task_time=task.TaskTime,
-                attributes={
-                    "FreeFloat": ifcopenshell.util.date.datetime2ifc(data["free_float"], "IfcDuration"),
-                    "TotalFloat": ifcopenshell.util.date.datetime2ifc(data["total_float"], "IfcDuration"),
-                    "IsCritical": data["total_float"].days == 0,
-                    "EarlyStart": ifcopenshell.util.date.datetime2ifc(data["early_start"], "IfcDateTime"),
-                    "EarlyFinish": ifcopenshell.util.date.datetime2ifc(data["early_finish"], "IfcDateTime"),
-                    "LateStart": ifcopenshell.util.date.datetime2ifc(data["late_start"], "IfcDateTime"),
-                    "LateFinish": ifcopenshell.util.date.datetime2ifc(data["late_finish"], "IfcDateTime"),
-                },
+            changed.add(node)
+            for successor in self.g.successors(node):
+                if successor not in queued:
+                    queued.add(successor)
+                    heapq.heappush(queue, (order[successor], successor))
+        return changed
+
+    def backward(self, nodes: set[Union[int, str]]) -> set[Union[int, str]]:
+        """Runs the backward pass from the nodes backwards, returning nodes whose results changed"""
+        order = self.get_order()
+        queue = [(-order[node], node) for node in nodes if node in order]
+        heapq.heapify(queue)
+        queued = {node for _, node in queue}
+        changed = set()
+        while queue:
+            node = heapq.heappop(queue)[1]
+            data = self.g.nodes[node]
+            before = self.results.get(node)
+            for key in ("late_start", "late_finish", "total_float", "free_float"):
+                data.pop(key, None)
+            self.backward_pass(node)
+            result = tuple(
+                data[key]
+                for key in ("early_start", "early_finish", "late_start", "late_finish", "total_float", "free_float")
             )
+            if result == before:
+                continue
+            changed.add(node)
+            self.results[node] = result
+            if before and before[2:4] == result[2:4]:
+                continue
+            for predecessor in self.g.predecessors(node):
+                if predecessor not in queued:
+                    queued.add(predecessor)
+                    heapq.heappush(queue, (-order[predecessor], predecessor))
+        return changed
 
     def offset_date(self, date: datetime.datetime, days: int, node: dict) -> datetime.datetime:
         return ifcopenshell.util.sequence.offset_date(
@@ -208,7 +383,7 @@ class Usecase:
         data = self.g.nodes[node]
 
         if node == "start":
-            data["early_start"] = min(self.start_dates)
+            data["early_start"] = min(self.start_dates.values())
         else:
             finishes = []
             starts = []
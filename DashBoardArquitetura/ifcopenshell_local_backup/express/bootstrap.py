@@ -162,7 +162,10 @@ statements = []
 
 terminals = reduce(lambda x, y: x | y, (find_bytype(e, Terminal) for id, e in express))
 keywords = list(filter(operator.attrgetter("is_keyword"), terminals))
-negated_keywords = map(lambda s: "~%s" % s, keywords)
+# a single lookahead for all keywords, rather than one per keyword, as simple_id is tried at nearly every token
+negated_keywords = [
+    '~Regex(r"(?i)(?<![a-z0-9_$])(?:%s)(?![a-z0-9_$])")' % "|".join(sorted(k.contents[1:-1] for k in keywords))
+]
 no_action = {"letter", "digit", "digits", "real_literal", "integer_literal", "string_literal", "simple_string_literal", "letter", "not_quote", "not_paren_star_quote_special"}
 
 while True:
@@ -208,32 +211,96 @@ if __name__ == "__main__":
 # This file is generated by IfcOpenShell ifcexpressparser bootstrap.py
 
 from __future__ import annotations
+import gc
 import os
+import re
 import sys
 import pickle
+import hashlib
+import contextlib
 
 import schema
 import mapping
+import nodes
 
 from pyparsing import *
 from nodes import *
 
+# Parsed schemas are cached here, keyed by a hash of their contents, defaults
+# to __pycache__ next to the schema
+cache_dir = os.environ.get("IFCOPENSHELL_EXPRESS_CACHE_DIR")
+
+# Comments are blanked out before parsing instead of being passed to ignore(),
+# which makes pyparsing try them in front of every single token. String literals
+# are matched too so that comment markers inside of them are left alone.
+comment = re.compile(r"'(?:[^']|'')*'|--[^\n]*|\(\*.*?\*\)", re.S)
+
+
+# Replaces comments with whitespace, so that offsets and line numbers are retained
+def strip_comments(text: str) -> str:
+    def blank(match):
+        s = match.group()
+        return s if s[0] == "'" else re.sub(r"[^\n]", " ", s)
+    return comment.sub(blank, text)
+
+
+# The cache file depends on the schema contents and the code that builds the mapping
+def get_cache_filename(fn: str, contents: bytes) -> str:
+    h = hashlib.sha256(contents)
+    for module_fn in (__file__, schema.__file__, mapping.__file__, nodes.__file__):
+        with open(module_fn, "rb") as f:
+            h.update(f.read())
+    directory = cache_dir or os.path.join(os.path.dirname(os.path.abspath(fn)), "__pycache__")
+    return os.path.join(directory, f"{os.path.basename(fn)}.{h.hexdigest()[:16]}.{pickle.HIGHEST_PROTOCOL}.dat")
+
+
+@contextlib.contextmanager
+def gc_suspended():
+    # a mapping consists of a great many small objects, without suspending the
+    # garbage collector it dominates the time spent (un)pickling it
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_cache(cache_file: str) -> mapping.Mapping | None:
+    try:
+        with open(cache_file, "rb") as f, gc_suspended():
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def write_cache(cache_file: str, m: mapping.Mapping) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # written under a temporary name so concurrent parses never read partial files
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f, gc_suspended():
+            pickle.dump(m, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # not writable, the schema is parsed again next time
+        pass
+
+
 def parse(fn: str) -> mapping.Mapping:
-    cache_file = fn + ".cache.dat"
-    if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(fn):
-        with open(cache_file, "rb") as f:
-            m = pickle.load(f)
-    else:      
+    with open(fn, "rb") as f:
+        contents = f.read()
+    cache_file = get_cache_filename(fn, contents)
+    m = read_cache(cache_file)
+    if m is None:
         %s
 
-        syntax.ignore("--" + restOfLine)
-        syntax.ignore(Regex(r"\((?:\*(?:[^*]*\*+)+?\))"))
-        ast = syntax.parseFile(fn)
+        ast = syntax.parseString(strip_comments(contents.decode("utf-8")))
         s = schema.Schema(ast)
         m = mapping.Mapping(s)
 
-        with open(cache_file, "wb") as f:
-            pickle.dump(m, f, protocol=0)
+        write_cache(cache_file, m)
     return m
             
 if __name__ == "__main__":
@@ -243,5 +310,6 @@ if __name__ == "__main__":
         mdl = importlib.import_module(output)
         mdl.Generator(m).emit()
     sys.stdout.write(m.schema.name)
+
 """ % ("\n        ".join(statements))
     )
@@ -2,22 +2,89 @@
 # This file is generated by IfcOpenShell ifcexpressparser bootstrap.py
 
 from __future__ import annotations
+import gc
 import os
+import re
 import sys
 import pickle
+import hashlib
+import contextlib
 
 import schema
 import mapping
+import nodes
 
 from pyparsing import *
 from nodes import *
 
+# Parsed schemas are cached here, keyed by a hash of their contents, defaults
+# to __pycache__ next to the schema
+cache_dir = os.environ.get("IFCOPENSHELL_EXPRESS_CACHE_DIR")
+
+# Comments are blanked out before parsing instead of being passed to ignore(),
+# which makes pyparsing try them in front of every single token. String literals
+# are matched too so that comment markers inside of them are left alone.
+comment = re.compile(r"'(?:[^']|'')*'|--[^\n]*|\(\*.*?\*\)", re.S)
+
+
+# Replaces comments with whitespace, so that offsets and line numbers are retained
+def strip_comments(text: str) -> str:
+    def blank(match):
+        s = match.group()
+        return s if s[0] == "'" else re.sub(r"[^\n]", " ", s)
+    return comment.sub(blank, text)
+
+
+# The cache file depends on the schema contents and the code that builds the mapping
+def get_cache_filename(fn: str, contents: bytes) -> str:
+    h = hashlib.sha256(contents)
+    for module_fn in (__file__, schema.__file__, mapping.__file__, nodes.__file__):
+        with open(module_fn, "rb") as f:
+            h.update(f.read())
+    directory = cache_dir or os.path.join(os.path.dirname(os.path.abspath(fn)), "__pycache__")
+    return os.path.join(directory, f"{os.path.basename(fn)}.{h.hexdigest()[:16]}.{pickle.HIGHEST_PROTOCOL}.dat")
+
+
+@contextlib.contextmanager
+def gc_suspended():
+    # a mapping consists of a great many small objects, without suspending the
+    # garbage collector it dominates the time spent (un)pickling it
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_cache(cache_file: str) -> mapping.Mapping | None:
+    try:
+        with open(cache_file, "rb") as f, gc_suspended():
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def write_cache(cache_file: str, m: mapping.Mapping) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # written under a temporary name so concurrent parses never read partial files
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f, gc_suspended():
+            pickle.dump(m, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # not writable, the schema is parsed again next time
+        pass
+
+
 def parse(fn: str) -> mapping.Mapping:
-    cache_file = fn + ".cache.dat"
-    if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(fn):
-        with open(cache_file, "rb") as f:
-            m = pickle.load(f)
-    else:      
+    with open(fn, "rb") as f:
+        contents = f.read()
+    cache_file = get_cache_filename(fn, contents)
+    m = read_cache(cache_file)
+    if m is None:
         ABS = (CaselessKeyword("abs")).setParseAction(lambda s, loc, t: Node(s, loc, t, rule="ABS"))("ABS")
         ABSTRACT = (CaselessKeyword("abstract")).setParseAction(lambda s, loc, t: Node(s, loc, t, rule="ABSTRACT"))("ABSTRACT")
         ACOS = (CaselessKeyword("acos")).setParseAction(lambda s, loc, t: Node(s, loc, t, rule="ACOS"))("ACOS")
@@ -153,7 +220,7 @@ def parse(fn: str) -> mapping.Mapping:
         special = ((not_paren_star_quote_special | CaselessLiteral("(") | CaselessLiteral(")") | CaselessLiteral("*") | CaselessLiteral("\"\""))).setParseAction(lambda s, loc, t: Node(s, loc, t, rule="special"))("special")
         binary_literal = ((CaselessLiteral("%") + bit + ZeroOrMore(bit))).setParseAction(lambda s, loc, t: ListNode(s, loc, t, rule="binary_literal"))("binary_literal")
         integer_literal = (digits)("integer_literal")
-        simple_id = ~CaselessKeyword("generic") + ~CaselessKeyword("value") + ~CaselessKeyword("case") + ~CaselessKeyword("for") + ~CaselessKeyword("sin") + ~CaselessKeyword("value_unique") + ~CaselessKeyword("extensible") + ~CaselessKeyword("tan") + ~CaselessKeyword("local") + ~CaselessKeyword("string") + ~CaselessKeyword("procedure") + ~CaselessKeyword("derive") + ~CaselessKeyword("end_if") + ~CaselessKeyword("supertype") + ~CaselessKeyword("entity") + ~CaselessKeyword("oneof") + ~CaselessKeyword("constant") + ~CaselessKeyword("end_case") + ~CaselessKeyword("end_alias") + ~CaselessKeyword("unknown") + ~CaselessKeyword("total_over") + ~CaselessKeyword("div") + ~CaselessKeyword("type") + ~CaselessKeyword("true") + ~CaselessKeyword("end_repeat") + ~CaselessKeyword("unique") + ~CaselessKeyword("end_rule") + ~CaselessKeyword("number") + ~CaselessKeyword("end_function") + ~CaselessKeyword("where") + ~CaselessKeyword("self") + ~CaselessKeyword("usedin") + ~CaselessKeyword("end_type") + ~CaselessKeyword("logical") + ~CaselessKeyword("generic_entity") + ~CaselessKeyword("end_schema") + ~CaselessKeyword("xor") + ~CaselessKeyword("until") + ~CaselessKeyword("to") + ~CaselessKeyword("in") + ~CaselessKeyword("inverse") + ~CaselessKeyword("enumeration") + ~CaselessKeyword("var") + ~CaselessKeyword("value_in") + ~CaselessKeyword("const_e") + ~CaselessKeyword("use") + ~CaselessKeyword("exists") + ~CaselessKeyword("exp") + ~CaselessKeyword("while") + ~CaselessKeyword("if") + ~CaselessKeyword("fixed") + ~CaselessKeyword("subtype") + ~CaselessKeyword("format") + ~CaselessKeyword("as") + ~CaselessKeyword("and") + ~CaselessKeyword("rule") + ~CaselessKeyword("function") + ~CaselessKeyword("lobound") + ~CaselessKeyword("length") + ~CaselessKeyword("hiindex") + ~CaselessKeyword("log2") + ~CaselessKeyword("reference") + ~CaselessKeyword("skip") + ~CaselessKeyword("with") + ~CaselessKeyword("integer") + ~CaselessKeyword("sqrt") + ~CaselessKeyword("insert") + ~CaselessKeyword("nvl") + ~CaselessKeyword("log") + ~CaselessKeyword("boolean") + ~CaselessKeyword("from") + ~CaselessKeyword("rolesof") + ~CaselessKeyword("hibound") + ~CaselessKeyword("abs") + ~CaselessKeyword("like") + ~CaselessKeyword("pi") + ~CaselessKeyword("alias") + ~CaselessKeyword("not") + ~CaselessKeyword("repeat") + ~CaselessKeyword("based_on") + ~CaselessKeyword("subtype_constraint") + ~CaselessKeyword("asin") + ~CaselessKeyword("optional") + ~CaselessKeyword("list") + ~CaselessKeyword("abstract") + ~CaselessKeyword("mod") + ~CaselessKeyword("false") + ~CaselessKeyword("log10") + ~CaselessKeyword("loindex") + ~CaselessKeyword("aggregate") + ~CaselessKeyword("end_constant") + ~CaselessKeyword("end") + ~CaselessKeyword("sizeof") + ~CaselessKeyword("remove") + ~CaselessKeyword("acos") + ~CaselessKeyword("set") + ~CaselessKeyword("renamed") + ~CaselessKeyword("end_local") + ~CaselessKeyword("of") + ~CaselessKeyword("escape") + ~CaselessKeyword("begin") + ~CaselessKeyword("select") + ~CaselessKeyword("end_procedure") + ~CaselessKeyword("else") + ~CaselessKeyword("end_subtype_constraint") + ~CaselessKeyword("cos") + ~CaselessKeyword("real") + ~CaselessKeyword("query") + ~CaselessKeyword("odd") + ~CaselessKeyword("andor") + ~CaselessKeyword("return") + ~CaselessKeyword("then") + ~CaselessKeyword("end_entity") + ~CaselessKeyword("array") + ~CaselessKeyword("blength") + ~CaselessKeyword("or") + ~CaselessKeyword("typeof") + ~CaselessKeyword("binary") + ~CaselessKeyword("atan") + ~CaselessKeyword("by") + ~CaselessKeyword("otherwise") + ~CaselessKeyword("bag") + ~CaselessKeyword("schema") + originalTextFor(Combine((letter + ZeroOrMore((letter | digit | CaselessLiteral("_"))))))("simple_id")
+        simple_id = ~Regex(r"(?i)(?<![a-z0-9_$])(?:abs|abstract|acos|aggregate|alias|and|andor|array|as|asin|atan|bag|based_on|begin|binary|blength|boolean|by|case|const_e|constant|cos|derive|div|else|end|end_alias|end_case|end_constant|end_entity|end_function|end_if|end_local|end_procedure|end_repeat|end_rule|end_schema|end_subtype_constraint|end_type|entity|enumeration|escape|exists|exp|extensible|false|fixed|for|format|from|function|generic|generic_entity|hibound|hiindex|if|in|insert|integer|inverse|length|like|list|lobound|local|log|log10|log2|logical|loindex|mod|not|number|nvl|odd|of|oneof|optional|or|otherwise|pi|procedure|query|real|reference|remove|renamed|repeat|return|rolesof|rule|schema|select|self|set|sin|sizeof|skip|sqrt|string|subtype|subtype_constraint|supertype|tan|then|to|total_over|true|type|typeof|unique|unknown|until|use|usedin|value|value_in|value_unique|var|where|while|with|xor)(?![a-z0-9_$])") + originalTextFor(Combine((letter + ZeroOrMore((letter | digit | CaselessLiteral("_"))))))("simple_id")
         simple_string_literal = ((CaselessLiteral("'") + ZeroOrMore(((CaselessLiteral("'") + CaselessLiteral("'")) | not_quote)) + CaselessLiteral("'")))("simple_string_literal")
         abstract_entity_declaration = (ABSTRACT)("abstract_entity_declaration")
         abstract_supertype = ((ABSTRACT + SUPERTYPE + CaselessLiteral(";"))).setParseAction(lambda s, loc, t: Node(s, loc, t, rule="abstract_supertype"))("abstract_supertype")
@@ -470,14 +537,11 @@ def parse(fn: str) -> mapping.Mapping:
         bound_spec << (((CaselessLiteral("[") + bound_1 + CaselessLiteral(":") + bound_2 + CaselessLiteral("]")))).setParseAction(BoundSpecification)
         derive_clause << (((DERIVE + derived_attr + ZeroOrMore(derived_attr)))).setParseAction(AttributeList)
 
-        syntax.ignore("--" + restOfLine)
-        syntax.ignore(Regex(r"\((?:\*(?:[^*]*\*+)+?\))"))
-        ast = syntax.parseFile(fn)
+        ast = syntax.parseString(strip_comments(contents.decode("utf-8")))
         s = schema.Schema(ast)
         m = mapping.Mapping(s)
 
-        with open(cache_file, "wb") as f:
-            pickle.dump(m, f, protocol=0)
+        write_cache(cache_file, m)
     return m
             
 if __name__ == "__main__":
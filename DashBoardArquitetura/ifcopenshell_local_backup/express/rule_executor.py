@@ -1,7 +1,13 @@
 import os
 import re
 import ast
+import sys
+import marshal
+import time
+import hashlib
+import contextlib
 import collections
+import multiprocessing
 import ifcopenshell
 from logging import Logger
 from dataclasses import dataclass
@@ -63,9 +69,207 @@ def fix_type(v):
     return v
 
 
-def run(f: ifcopenshell.file, logger: Logger) -> None:
+@dataclass
+class rule_module:
+    source_lines: list[str]
+    rules: list
+
+
+# Rule modules compiled in this process by path, along with the modification
+# time and size of the file they were compiled from
+registry: dict[str, tuple[tuple[int, int], rule_module]] = {}
+
+# Rewritten bytecode is cached here, defaults to __pycache__ next to the rules
+cache_dir = os.environ.get("IFCOPENSHELL_RULE_CACHE_DIR")
+
+
+def get_rules_filename(schema_identifier: str) -> str:
+    fn = os.path.join(os.path.dirname(__file__), "rules", f"{schema_identifier}.py")
+    if os.path.exists(fn):
+        return fn
+
+    import subprocess
+
+    current_dir_files = {fn.lower(): fn for fn in os.listdir('.')}
+    schema_name = str(schema_identifier).split(' ')[-1].lower()
+    schema_path = current_dir_files.get(schema_name + '.exp')
+    if schema_path is None:
+        raise FileNotFoundError(f"No rules found for schema {schema_identifier}")
+    fn = schema_path[:-4] + '.py'
+    if not os.path.exists(fn):
+        subprocess.run([sys.executable, "-m", "ifcopenshell.express.rule_compiler", schema_path, fn], check=True)
+    return fn
+
+
+def load_rules(fn: str, name: str) -> rule_module:
+    """Returns the rules in module `fn` with the asserts rewritten by pytest
+
+    Modules are compiled once per process. The rewritten bytecode is also
+    cached on disk, keyed by the name and a hash of the source, so that the
+    parsing and rewriting only happens once for every version of the rules.
+    """
+    stat = os.stat(fn)
+    key = (stat.st_mtime_ns, stat.st_size)
+    if (entry := registry.get(fn)) and entry[0] == key:
+        return entry[1]
+
+    import _pytest
     from _pytest import assertion
 
+    with open(fn, "r") as f:
+        source = f.read()
+
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    directory = cache_dir or os.path.join(os.path.dirname(fn), "__pycache__")
+    cache_fn = os.path.join(
+        directory, f"{name}.{digest}.{sys.implementation.cache_tag}.pytest-{_pytest.__version__}.rules"
+    )
+
+    try:
+        with open(cache_fn, "rb") as f:
+            code = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        a = ast.parse(source)
+        assertion.rewrite.rewrite_asserts(mod=a, source=source)
+        code = compile(a, f"{name}.py", "exec")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # written under a temporary name so concurrent validations never read partial files
+            tmp_fn = f"{cache_fn}.{os.getpid()}.tmp"
+            with open(tmp_fn, "wb") as f:
+                marshal.dump(code, f)
+            os.replace(tmp_fn, cache_fn)
+        except OSError:
+            # not writable, the rules are compiled again in the next process
+            pass
+
+    scope = {}
+    exec(code, scope)
+    module = rule_module(
+        source_lines=source.split("\n"),
+        rules=list(filter(lambda x: hasattr(x, "SCOPE"), scope.values())),
+    )
+    registry[fn] = (key, module)
+    return module
+
+
+@dataclass
+class rule_statistics:
+    invocations: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    violations: int = 0
+
+
+class rule_measurement:
+    def __init__(self, rules, name):
+        self.rules = rules
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        st = self.rules[self.name]
+        st.invocations += 1
+        st.total_time += elapsed
+        st.max_time = max(st.max_time, elapsed)
+        if exc_type is not None:
+            st.violations += 1
+        # the exception, if any, is propagated
+        return False
+
+
+class rule_profile:
+    """Records the invocations, wall time and violations of every rule.
+
+    Global rules are recorded by name, type and entity rules as
+    TYPE_NAME.RULE_NAME.
+
+    .. code:: python
+
+        profile = rule_profile()
+        run(f, logger, profile=profile)
+        print(json.dumps(profile.asdict()))
+    """
+
+    def __init__(self):
+        self.rules = collections.defaultdict(rule_statistics)
+
+    def measure(self, name):
+        return rule_measurement(self.rules, name)
+
+    def update(self, rules):
+        # merges the statistics recorded by a worker process
+        for name, other in rules.items():
+            st = self.rules[name]
+            st.invocations += other.invocations
+            st.total_time += other.total_time
+            st.max_time = max(st.max_time, other.max_time)
+            st.violations += other.violations
+
+    def asdict(self):
+        # rules in order of decreasing total time
+        return {
+            name: vars(st).copy()
+            for name, st in sorted(self.rules.items(), key=lambda item: -item[1].total_time)
+        }
+
+
+# Used instead of a measurement when not profiling
+no_measurement = contextlib.nullcontext()
+
+
+# The file and entity rules evaluated by the worker processes, which are
+# forked so that they share these with the parent process
+pool_state = None
+
+# Number of instances in a single task for the worker processes
+POOL_TASK_SIZE = 512
+
+
+def evaluate_entity_rules(task):
+    f, entity_rules, profiling = pool_state
+    rule_index, ids = task
+    R = entity_rules[rule_index]
+    profile = rule_profile() if profiling else None
+    measure = profile.measure(f"{R.TYPE_NAME}.{R.RULE_NAME}") if profiling else no_measurement
+    violations = []
+    for inst_id in ids:
+        try:
+            with measure:
+                R()(f.by_id(inst_id))
+        except Exception as e:
+            violations.append((rule_index, inst_id, e.__traceback__.tb_next.tb_lineno, e.args[0]))
+    return violations, profile and dict(profile.rules)
+
+
+def evaluate_entity_rules_in_pool(f, entity_rules, processes, profile=None):
+    """Evaluates the entity rules on a pool of forked processes, yielding
+    (rule index, instance id, line number, violation) in the same order as
+    a serial evaluation would encounter them. The statistics recorded by
+    the workers are added to profile."""
+    global pool_state
+
+    tasks = []
+    for rule_index, R in enumerate(entity_rules):
+        ids = [inst.id() for inst in f.by_type(R.TYPE_NAME)]
+        tasks.extend((rule_index, ids[i : i + POOL_TASK_SIZE]) for i in range(0, len(ids), POOL_TASK_SIZE))
+
+    pool_state = f, entity_rules, profile is not None
+    try:
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            chunksize = max(1, len(tasks) // (processes * 4))
+            for violations, statistics in pool.imap(evaluate_entity_rules, tasks, chunksize):
+                if profile is not None:
+                    profile.update(statistics)
+                yield from violations
+    finally:
+        pool_state = None
+
+
+def run(f: ifcopenshell.file, logger: Logger, processes: int = 1, profile: rule_profile = None) -> None:
     if hasattr(logger, "set_instance"):
         # when using the json logger, we notify it of the relevant instance
         pre_annotate_instance = lambda instance: logger.set_state('instance', instance) if hasattr(logger, 'set_state') else None
@@ -79,41 +283,23 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
         pre_annotate_attribute = lambda attribute: None
         post_annotate_attribute = lambda attribute: attribute
 
+    measure = profile.measure if profile is not None else lambda name: no_measurement
+
     orig = ifcopenshell.settings.unpack_non_aggregate_inverses
     ifcopenshell.settings.unpack_non_aggregate_inverses = True
 
-    fn = os.path.join(os.path.dirname(__file__), "rules", f"{f.schema_identifier}.py")
-    try:
-        source = open(fn, "r").read()
-    except FileNotFoundError as e:
-        import sys
-        import time
-        import subprocess
-
-        current_dir_files = {fn.lower(): fn for fn in os.listdir('.')}
-        schema_name = str(f.schema_identifier).split(' ')[-1].lower()
-        schema_path = current_dir_files.get(schema_name + '.exp')
-        fn = schema_path[:-4] + '.py'
-        if not os.path.exists(fn):
-            subprocess.run([sys.executable, "-m", "ifcopenshell.express.rule_compiler", schema_path, fn], check=True)
-            time.sleep(1.)
-        source = open(fn, "r").read()
-
-    a = ast.parse(source)
-    assertion.rewrite.rewrite_asserts(mod=a, source=source)
-    cd = compile(a, f"{f.schema_identifier}.py", "exec")
-    scope = {}
-    exec(cd, scope)
+    module = load_rules(get_rules_filename(f.schema_identifier), f.schema_identifier)
+    source_lines = module.source_lines
+    rules = module.rules
     S = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema_identifier)
 
-    rules = list(filter(lambda x: hasattr(x, "SCOPE"), scope.values()))
-
     if hasattr(logger, 'set_state'):
         logger.set_state('type', 'global_rule')
 
     for R in [r for r in rules if r.SCOPE == "file"]:
         try:
-            R()(f)
+            with measure(R.__name__):
+                R()(f)
         except Exception as e:
             ln = e.__traceback__.tb_next.tb_lineno
             pre_annotate_attribute(R.__name__)
@@ -121,7 +307,7 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
                 str(
                     error(
                         post_annotate_attribute(R.__name__),
-                        reverse_compile(source.split("\n")[ln - 1]),
+                        reverse_compile(source_lines[ln - 1]),
                         reverse_compile(e.args[0]),
                     )
                 )
@@ -141,8 +327,11 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
                 subtypes[d.declared_type().declared_type().name()].append(d.name())
 
     D = collections.defaultdict(list)
+    # one measurement per rule, created up front as check() runs for every attribute value
+    type_rule_measures = {}
     for r in rules:
         if r.SCOPE == "type":
+            type_rule_measures[r] = measure(f"{r.TYPE_NAME}.{r.RULE_NAME}")
 
             def visit(nm):
                 D[nm].append(r)
@@ -169,7 +358,8 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
         if type_name(type) in D:
             for R in D[type_name(type)]:
                 try:
-                    R()(fix_type(value))
+                    with type_rule_measures[R]:
+                        R()(fix_type(value))
                 except Exception as e:
                     ln = e.__traceback__.tb_next.tb_lineno
                     pre_annotate_instance(instance)
@@ -178,7 +368,7 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
                         str(
                             error(
                                 post_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}"),
-                                reverse_compile(source.split("\n")[ln - 1]),
+                                reverse_compile(source_lines[ln - 1]),
                                 reverse_compile(e.args[0]),
                                 post_annotate_instance(instance),
                             )
@@ -217,6 +407,40 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
                 # unpack the type instance
                 check(value[0], S.declaration_by_name(value.is_a()), instance=inst)
 
+    # Whether values of a type can be subject to a rule, directly or through
+    # the elements of aggregates and the types in selects, by declaration name
+    has_rules = {}
+
+    def declaration_has_rules(decl):
+        name = decl.name()
+        if name not in has_rules:
+            # guards against recursion through nested selects
+            has_rules[name] = name in D
+            if isinstance(decl, ifcopenshell.ifcopenshell_wrapper.type_declaration):
+                has_rules[name] |= type_has_rules(decl.declared_type())
+            elif isinstance(decl, ifcopenshell.ifcopenshell_wrapper.select_type):
+                has_rules[name] |= any(map(declaration_has_rules, decl.select_list()))
+        return has_rules[name]
+
+    def type_has_rules(ty):
+        if isinstance(ty, ifcopenshell.ifcopenshell_wrapper.named_type):
+            return declaration_has_rules(ty.declared_type())
+        elif isinstance(ty, ifcopenshell.ifcopenshell_wrapper.aggregation_type):
+            return type_has_rules(ty.type_of_element())
+        return False
+
+    # The indices and types of the attributes to check, by entity name
+    plans = {}
+
+    def get_plan(entity_name):
+        entity = S.declaration_by_name(entity_name)
+        return [
+            (i, attr.type_of_attribute())
+            for i, (attr, is_derived) in enumerate(zip(entity.all_attributes(), entity.derived()))
+            # @todo derived attributes
+            if not is_derived and type_has_rules(attr.type_of_attribute())
+        ]
+
     for inst in f:
         try:
             values = list(inst)
@@ -226,38 +450,44 @@ def run(f: ifcopenshell.file, logger: Logger) -> None:
             else:
                 logger.error("For instance:\n    %s\n%s", inst, e)
             continue
-        entity = S.declaration_by_name(inst.is_a())
-        attrs = entity.all_attributes()
-        for i, (attr, val, is_derived) in enumerate(
-            zip(attrs, values, entity.derived())
-        ):
-            if is_derived:
-                # @todo
-                pass
-            else:
-                check(val, attr.type_of_attribute(), instance=inst)
+        entity_name = inst.is_a()
+        if (plan := plans.get(entity_name)) is None:
+            plan = plans[entity_name] = get_plan(entity_name)
+        for i, ty in plan:
+            if i < len(values):
+                check(values[i], ty, instance=inst)
 
     if hasattr(logger, 'set_state'):
         logger.set_state('type', 'entity_rule')
 
-    for R in [r for r in rules if r.SCOPE == "entity"]:
-        for inst in f.by_type(R.TYPE_NAME):
-            try:
-                R()(inst)
-            except Exception as e:
-                ln = e.__traceback__.tb_next.tb_lineno
-                pre_annotate_instance(inst)
-                pre_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}")
-                logger.error(
-                    str(
-                        error(
-                            post_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}"),
-                            reverse_compile(source.split("\n")[ln - 1]),
-                            reverse_compile(e.args[0]),
-                            post_annotate_instance(inst),
-                        )
-                    )
+    entity_rules = [r for r in rules if r.SCOPE == "entity"]
+
+    def report(R, inst, ln, violation):
+        pre_annotate_instance(inst)
+        pre_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}")
+        logger.error(
+            str(
+                error(
+                    post_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}"),
+                    reverse_compile(source_lines[ln - 1]),
+                    reverse_compile(violation),
+                    post_annotate_instance(inst),
                 )
+            )
+        )
+
+    if processes > 1 and "fork" in multiprocessing.get_all_start_methods():
+        for rule_index, inst_id, ln, violation in evaluate_entity_rules_in_pool(f, entity_rules, processes, profile):
+            report(entity_rules[rule_index], f.by_id(inst_id), ln, violation)
+    else:
+        for R in entity_rules:
+            rule_measure = measure(f"{R.TYPE_NAME}.{R.RULE_NAME}")
+            for inst in f.by_type(R.TYPE_NAME):
+                try:
+                    with rule_measure:
+                        R()(inst)
+                except Exception as e:
+                    report(R, inst, e.__traceback__.tb_next.tb_lineno, e.args[0])
 
     ifcopenshell.settings.unpack_non_aggregate_inverses = orig
 
@@ -271,6 +501,7 @@ if __name__ == "__main__":
 
     filenames = [x for x in sys.argv[1:] if not x.startswith("--")]
     flags = set(x for x in sys.argv[1:] if x.startswith("--"))
+    processes = int(next((x.split("=")[1] for x in flags if x.startswith("--processes=")), 1))
 
     for fn in filenames:
         if "--json" in flags:
@@ -281,7 +512,12 @@ if __name__ == "__main__":
 
         f = ifcopenshell.open(fn)
 
-        run(f, logger)
+        profile = rule_profile() if "--profile" in flags else None
+
+        run(f, logger, processes=processes, profile=profile)
 
         if "--json" in flags:
             print("\n".join(json.dumps(x, default=str) for x in logger.statements))
+
+        if profile is not None:
+            print(json.dumps({"type": "rule_profile", "rules": profile.asdict()}))
@@ -8,8 +8,13 @@ import os
 import sys
 import json
 import math
+import hashlib
+import itertools
+import sqlite3
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator
 from pathlib import Path
 
 try:
@@ -21,11 +26,37 @@ except ImportError:
     print("📦 Execute: pip install ifcopenshell")
     sys.exit(1)
 
+try:
+    import ifcopenshell.geom
+    import ifcopenshell.util.shape
+    GEOMETRIA_DISPONIVEL = True
+except ImportError:
+    print("⚠️ ifcopenshell.geom não disponível, volumes geométricos desativados")
+    GEOMETRIA_DISPONIVEL = False
+
 try:
     import numpy as np
 except ImportError:
-    print("⚠️ numpy não encontrado, usando cálculos básicos")
-    np = None
+    print("❌ Erro: numpy não instalado!")
+    print("📦 Execute: pip install numpy")
+    sys.exit(1)
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    # Opcional: sem pyarrow a exportação colunar usa apenas o formato .npz
+    pa = None
+
+# Colunas de texto e numéricas da exportação colunar (uma linha por elemento)
+COLUNAS_TEXTO = ["guid", "nome", "tipo_ifc", "tipo_estrutural", "pavimento"]
+COLUNAS_NUMERICAS = ["volume_concreto", "peso_aco_total", "custo_concreto", "custo_armacao"]
+# Prefixos das colunas de peso (kg) e custo (R$) por bitola, ex: "peso_bitola_8.0 mm"
+PREFIXO_PESO_BITOLA = "peso_bitola_"
+PREFIXO_CUSTO_BITOLA = "custo_bitola_"
+# Incrementar quando o formato dos registros ou do hash mudar, invalidando caches antigos
+VERSAO_CACHE = 2
 
 
 class IFCSteelExtractor:
@@ -34,6 +65,20 @@ class IFCSteelExtractor:
     Processa elementos estruturais e calcula volumes/pesos de aço
     """
     
+    # Tipos de elementos estruturais para buscar
+    TIPOS_ESTRUTURAIS = [
+        'IfcBeam',           # Vigas
+        'IfcColumn',         # Pilares
+        'IfcSlab',           # Lajes
+        'IfcWall',           # Paredes/muros
+        'IfcFooting',        # Sapatas
+        'IfcPile',           # Estacas
+        'IfcRamp',           # Rampas
+        'IfcStair',          # Escadas
+        'IfcMember',         # Elementos gerais
+        'IfcPlate'           # Placas
+    ]
+    
     def __init__(self, arquivo_ifc: str):
         """
         Inicializa o extrator
@@ -44,6 +89,8 @@ class IFCSteelExtractor:
         self.arquivo_ifc = arquivo_ifc
         self.ifc_file = None
         self.project_info = {}
+        self._indice_propriedades = None
+        self._volumes_geometricos = None
         
         # Configurações padrão
         self.config = {
@@ -86,6 +133,10 @@ class IFCSteelExtractor:
                 },
                 "data_referencia": "07/2025",
                 "observacoes": "Preços baseados na tabela SINAPI"
+            },
+            "geometria": {
+                "calcular_volume": True,  # Tesselar elementos sem Qto de volume
+                "threads": os.cpu_count() or 1
             }
         }
     
@@ -103,6 +154,8 @@ class IFCSteelExtractor:
             
             print(f"📂 Carregando arquivo IFC: {self.arquivo_ifc}")
             self.ifc_file = ifcopenshell.open(self.arquivo_ifc)
+            self._indice_propriedades = None
+            self._volumes_geometricos = None
             
             if not self.ifc_file:
                 print("❌ Erro ao abrir arquivo IFC")
@@ -126,7 +179,13 @@ class IFCSteelExtractor:
             Dicionário com informações do projeto
         """
         if not self.ifc_file:
-            return {"nome": "Projeto Desconhecido", "descricao": "", "fase": ""}
+            return {
+                "nome": "Projeto Desconhecido",
+                "descricao": "",
+                "fase": "",
+                "arquivo": os.path.basename(self.arquivo_ifc),
+                "data_extracao": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
         
         try:
             # Buscar projeto
@@ -181,55 +240,269 @@ class IFCSteelExtractor:
         except:
             return "mm"
     
-    def extrair_elementos_estruturais(self) -> List[Dict[str, Any]]:
+    def extrair_elementos_estruturais(self, processos: int = 1, tamanho_lote: int = 500) -> List[Dict[str, Any]]:
         """
         Extrai elementos estruturais do arquivo IFC
         
+        Args:
+            processos: Número de processos de trabalho (1 = serial)
+            tamanho_lote: Quantidade de elementos por lote enviado a cada processo
+            
         Returns:
             Lista de elementos estruturais com suas propriedades
         """
+        return list(self.iterar_elementos_estruturais(processos, tamanho_lote))
+    
+    def iterar_elementos_estruturais(self, processos: int = 1, tamanho_lote: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os registros dos elementos estruturais um a um
+        
+        Permite agregar os resultados de forma incremental, sem manter a lista
+        completa em memória. Com processos > 1 os elementos são divididos em
+        lotes (por tipo e por faixa de ids) e processados em paralelo; cada
+        processo abre sua própria cópia do arquivo IFC. Os pesos e custos são
+        calculados por lote no processo principal (ver calcular_custos).
+        
+        Args:
+            processos: Número de processos de trabalho (1 = serial)
+            tamanho_lote: Quantidade de elementos por lote enviado a cada processo
+            
+        Yields:
+            Dicionário com dados de cada elemento
+        """
         if not self.ifc_file:
-            return []
-        
-        elementos = []
-        
-        # Tipos de elementos estruturais para buscar
-        tipos_estruturais = [
-            'IfcBeam',           # Vigas
-            'IfcColumn',         # Pilares
-            'IfcSlab',           # Lajes
-            'IfcWall',           # Paredes/muros
-            'IfcFooting',        # Sapatas
-            'IfcPile',           # Estacas
-            'IfcRamp',           # Rampas
-            'IfcStair',          # Escadas
-            'IfcMember',         # Elementos gerais
-            'IfcPlate'           # Placas
-        ]
+            return
         
         print("🔍 Extraindo elementos estruturais...")
         
-        for tipo in tipos_estruturais:
-            try:
-                elementos_tipo = self.ifc_file.by_type(tipo)
-                print(f"   📋 {tipo}: {len(elementos_tipo)} elementos")
+        total = 0
+        if processos > 1:
+            registros = self._iterar_em_paralelo(processos, tamanho_lote)
+        else:
+            registros = self._iterar_em_serie()
+        
+        for dados_elemento in self._aplicar_custos(registros, tamanho_lote):
+            total += 1
+            yield dados_elemento
+        
+        print(f"✅ Total de elementos extraídos: {total}")
+    
+    def _iterar_em_serie(self, ids_por_tipo: Optional[Dict[str, List[int]]] = None) -> Iterator[Dict[str, Any]]:
+        """Processa os elementos (ou apenas os ids informados por tipo) no processo atual"""
+        for tipo in self.TIPOS_ESTRUTURAIS:
+            if ids_por_tipo is not None:
+                elementos_tipo = [self.ifc_file.by_id(id_elemento) for id_elemento in ids_por_tipo.get(tipo, [])]
+            else:
+                try:
+                    elementos_tipo = self.ifc_file.by_type(tipo)
+                    print(f"   📋 {tipo}: {len(elementos_tipo)} elementos")
+                except Exception as e:
+                    print(f"⚠️ Erro ao processar {tipo}: {str(e)}")
+                    continue
+            
+            for elemento in elementos_tipo:
+                dados_elemento = self._processar_elemento(elemento, tipo)
+                if dados_elemento:
+                    yield dados_elemento
+    
+    def _iterar_em_paralelo(self, processos: int, tamanho_lote: int,
+                            ids_por_tipo: Optional[Dict[str, List[int]]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Distribui os lotes de elementos entre processos de trabalho
+        
+        No máximo 2 lotes por processo ficam pendentes ao mesmo tempo, de modo
+        que a memória usada não cresce com o tamanho do modelo. Os registros
+        são devolvidos na mesma ordem do processamento em série.
+        """
+        lotes = self._gerar_lotes(tamanho_lote, ids_por_tipo)
+        pendentes = deque()
+        
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            initializer=_inicializar_processo,
+            initargs=(self.arquivo_ifc, self.config, self.project_info, self._obter_volumes_geometricos()),
+        ) as executor:
+            for tipo, ids in lotes:
+                pendentes.append(executor.submit(_processar_lote, tipo, ids))
+                if len(pendentes) >= processos * 2:
+                    yield from pendentes.popleft().result()
+            while pendentes:
+                yield from pendentes.popleft().result()
+    
+    def iterar_elementos_incremental(self, arquivo_cache: str, processos: int = 1,
+                                     tamanho_lote: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os registros dos elementos reaproveitando um cache SQLite
+        
+        O cache guarda, por GlobalId, um hash do conteúdo que influencia o
+        registro (classe, nome, descrição, propriedades, pavimento e, para os
+        elementos sem volume nas propriedades, a representação geométrica) e o
+        registro extraído, sem os pesos e custos, que são sempre recalculados
+        com a configuração atual. Apenas os elementos novos ou alterados são
+        processados (e tesselados); os removidos do modelo são apagados do
+        cache. Uma mudança na unidade do projeto ou no cálculo geométrico de
+        volumes descarta o cache inteiro.
+        
+        Args:
+            arquivo_cache: Caminho do banco SQLite (criado se não existir)
+            processos: Número de processos de trabalho (1 = serial)
+            tamanho_lote: Quantidade de elementos por lote enviado a cada processo
+            
+        Yields:
+            Dicionário com dados de cada elemento
+        """
+        registros = self._iterar_registros_incremental(arquivo_cache, processos, tamanho_lote)
+        yield from self._aplicar_custos(registros, tamanho_lote)
+    
+    def _iterar_registros_incremental(self, arquivo_cache: str, processos: int,
+                                      tamanho_lote: int) -> Iterator[Dict[str, Any]]:
+        """Gera os registros sem custos de iterar_elementos_incremental, lendo e atualizando o cache"""
+        if not self.ifc_file:
+            return
+        
+        print(f"🔍 Extraindo elementos estruturais (cache: {arquivo_cache})...")
+        
+        if not self.project_info:
+            self.extrair_info_projeto()
+        
+        conexao = sqlite3.connect(arquivo_cache)
+        volumes_restritos = False
+        try:
+            conexao.execute("CREATE TABLE IF NOT EXISTS contexto (chave TEXT PRIMARY KEY, valor TEXT)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS elementos (guid TEXT PRIMARY KEY, hash TEXT NOT NULL, registro TEXT)")
+            
+            contexto = self._calcular_contexto_cache()
+            linha = conexao.execute("SELECT valor FROM contexto WHERE chave = 'contexto'").fetchone()
+            if not linha or linha[0] != contexto:
+                conexao.execute("DELETE FROM elementos")
+                conexao.execute("INSERT OR REPLACE INTO contexto VALUES ('contexto', ?)", (contexto,))
+            hashes_cache = dict(conexao.execute("SELECT guid, hash FROM elementos"))
+            
+            elementos = []
+            for tipo in self.TIPOS_ESTRUTURAIS:
+                try:
+                    elementos.extend((tipo, elemento) for elemento in self.ifc_file.by_type(tipo))
+                except Exception as e:
+                    print(f"⚠️ Erro ao processar {tipo}: {str(e)}")
+            
+            # GlobalIds vazios ou repetidos não identificam o elemento, então não são guardados
+            ocorrencias = Counter(elemento.GlobalId for _, elemento in elementos)
+            
+            memo = {}
+            reaproveitados = set()
+            alterados = {}
+            hashes_alterados = {}
+            for tipo, elemento in elementos:
+                guid = elemento.GlobalId
+                hash_elemento = self._calcular_hash_elemento(elemento, memo)
+                if not guid or ocorrencias[guid] > 1:
+                    alterados.setdefault(tipo, []).append(elemento.id())
+                elif hashes_cache.get(guid) == hash_elemento:
+                    reaproveitados.add(guid)
+                else:
+                    alterados.setdefault(tipo, []).append(elemento.id())
+                    hashes_alterados[guid] = hash_elemento
+            
+            removidos = set(hashes_cache) - set(ocorrencias)
+            conexao.executemany("DELETE FROM elementos WHERE guid = ?", ((guid,) for guid in removidos))
+            
+            total_alterados = sum(len(ids) for ids in alterados.values())
+            print(f"   ♻️ {len(reaproveitados)} reaproveitados, {total_alterados} a processar, {len(removidos)} removidos")
+            
+            total = 0
+            for guid, registro in conexao.execute("SELECT guid, registro FROM elementos WHERE registro IS NOT NULL"):
+                if guid in reaproveitados:
+                    total += 1
+                    yield json.loads(registro)
+            
+            if total_alterados:
+                if self._volumes_geometricos is None:
+                    # Tesselar somente os elementos alterados
+                    ids_alterados = {id_elemento for ids in alterados.values() for id_elemento in ids}
+                    self._volumes_geometricos = self._calcular_volumes_geometricos(ids_alterados)
+                    volumes_restritos = True
                 
-                for elemento in elementos_tipo:
-                    dados_elemento = self._processar_elemento(elemento, tipo)
-                    if dados_elemento:
-                        elementos.append(dados_elemento)
-                        
-            except Exception as e:
-                print(f"⚠️ Erro ao processar {tipo}: {str(e)}")
-                continue
-        
-        print(f"✅ Total de elementos extraídos: {len(elementos)}")
-        return elementos
+                if processos > 1:
+                    registros = self._iterar_em_paralelo(processos, tamanho_lote, alterados)
+                else:
+                    registros = self._iterar_em_serie(alterados)
+                
+                linhas = {guid: (guid, hash_elemento, None) for guid, hash_elemento in hashes_alterados.items()}
+                for dados_elemento in registros:
+                    guid = dados_elemento["guid"]
+                    if guid in linhas:
+                        linhas[guid] = (guid, hashes_alterados[guid], json.dumps(dados_elemento, ensure_ascii=False))
+                    total += 1
+                    yield dados_elemento
+                
+                conexao.executemany("INSERT OR REPLACE INTO elementos VALUES (?, ?, ?)", linhas.values())
+            
+            conexao.commit()
+            print(f"✅ Total de elementos extraídos: {total}")
+        finally:
+            conexao.close()
+            if volumes_restritos:
+                self._volumes_geometricos = None
+    
+    def _calcular_contexto_cache(self) -> str:
+        """Resume tudo o que, além do próprio elemento, muda os registros guardados no cache"""
+        contexto = {
+            "versao": VERSAO_CACHE,
+            "calcular_volume": GEOMETRIA_DISPONIVEL and self.config["geometria"]["calcular_volume"],
+            "unidade_comprimento": self.project_info.get("unidade_comprimento"),
+        }
+        return hashlib.sha1(json.dumps(contexto, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def _calcular_hash_elemento(self, elemento, memo: Dict[int, str]) -> str:
+        """
+        Calcula o hash do conteúdo que influencia o registro do elemento
+        
+        Args:
+            elemento: Elemento IFC
+            memo: Hashes já calculados por id de entidade, compartilhado entre elementos
+            
+        Returns:
+            Hash hexadecimal
+        """
+        dados = self._obter_indice_propriedades().get(elemento.id()) or {}
+        container = ifcopenshell.util.element.get_container(elemento)
+        partes = [
+            elemento.is_a(),
+            elemento.Name,
+            elemento.Description,
+            dados.get("volume"),
+            dados.get("pavimento"),
+            getattr(container, "Name", None),
+        ]
+        # A geometria só é usada quando não há volume nas propriedades
+        if not dados.get("volume") and elemento.Representation:
+            partes.append(_hash_entidade(elemento.Representation, memo))
+        return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+    
+    def _gerar_lotes(self, tamanho_lote: int,
+                     ids_por_tipo: Optional[Dict[str, List[int]]] = None) -> Iterator[Tuple[str, List[int]]]:
+        """Divide os elementos estruturais (ou apenas os ids informados por tipo) em lotes de ids por tipo"""
+        for tipo in self.TIPOS_ESTRUTURAIS:
+            if ids_por_tipo is not None:
+                ids = ids_por_tipo.get(tipo, [])
+            else:
+                try:
+                    ids = [elemento.id() for elemento in self.ifc_file.by_type(tipo)]
+                except Exception as e:
+                    print(f"⚠️ Erro ao processar {tipo}: {str(e)}")
+                    continue
+                
+                print(f"   📋 {tipo}: {len(ids)} elementos")
+            for inicio in range(0, len(ids), tamanho_lote):
+                yield tipo, ids[inicio:inicio + tamanho_lote]
     
     def _processar_elemento(self, elemento, tipo_ifc: str) -> Optional[Dict[str, Any]]:
         """
         Processa um elemento individual
         
+        Extrai apenas o volume (sem arredondar), o tipo e o pavimento; os
+        pesos e custos são acrescentados depois por _aplicar_custos.
+        
         Args:
             elemento: Elemento IFC
             tipo_ifc: Tipo do elemento IFC
@@ -252,19 +525,9 @@ class IFCSteelExtractor:
             if volume_concreto <= 0:
                 return None
             
-            # Calcular aço baseado no volume de concreto
-            peso_aco = self._calcular_peso_aco(volume_concreto, tipo_estrutural)
-            
             # Obter pavimento
             pavimento = self._obter_pavimento(elemento)
             
-            # Distribuir por bitolas
-            bitolas = self._distribuir_bitolas(peso_aco, tipo_estrutural)
-            
-            # Calcular custos
-            custo_concreto = self._calcular_custo_concreto(volume_concreto)
-            custo_armacao = self._calcular_custo_armacao(bitolas, tipo_estrutural)
-            
             return {
                 "guid": guid,
                 "nome": nome,
@@ -272,11 +535,7 @@ class IFCSteelExtractor:
                 "tipo_ifc": tipo_ifc,
                 "tipo_estrutural": tipo_estrutural,
                 "pavimento": pavimento,
-                "volume_concreto": round(volume_concreto, 3),
-                "peso_aco_total": round(peso_aco, 2),
-                "bitolas": bitolas,
-                "custo_concreto": custo_concreto,
-                "custo_armacao": custo_armacao
+                "volume_concreto": volume_concreto
             }
             
         except Exception as e:
@@ -333,32 +592,170 @@ class IFCSteelExtractor:
     def _obter_volume_de_propriedades(self, elemento) -> float:
         """Tenta obter volume de property sets"""
         try:
-            # Buscar em property sets
-            psets = ifcopenshell.util.element.get_psets(elemento)
-            
-            for pset_name, pset_data in psets.items():
-                # Procurar propriedades de volume
-                for prop_name, prop_value in pset_data.items():
-                    if any(keyword in prop_name.lower() for keyword in ['volume', 'vol', 'cubic']):
-                        if isinstance(prop_value, (int, float)) and prop_value > 0:
-                            # Converter para m³ se necessário
-                            return self._converter_para_metros_cubicos(prop_value)
+            dados = self._obter_indice_propriedades().get(elemento.id())
+            if dados and dados["volume"]:
+                # Converter para m³ se necessário
+                return self._converter_para_metros_cubicos(dados["volume"])
             
             return 0
             
         except Exception:
             return 0
     
+    def _obter_indice_propriedades(self) -> Dict[int, Dict[str, Any]]:
+        """Retorna o índice de propriedades, construindo-o no primeiro uso"""
+        if self._indice_propriedades is None:
+            self._indice_propriedades = self._construir_indice_propriedades()
+        return self._indice_propriedades
+    
+    def _construir_indice_propriedades(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Constrói em uma única passada o índice de propriedades dos elementos
+        
+        Percorre os IfcRelDefinesByProperties e os property sets dos tipos
+        (IfcRelDefinesByType), combinando-os na mesma ordem de
+        ifcopenshell.util.element.get_psets. Cada definição é lida uma só vez e
+        a busca por palavra-chave é feita uma vez por nome de propriedade.
+        
+        Returns:
+            Dicionário id do elemento -> volume (unidade do arquivo), pavimento
+            e demais quantidades numéricas dos Qto
+        """
+        definicoes = {}
+        psets_ocorrencia = {}
+        psets_tipo = {}
+        tipo_por_elemento = {}
+        
+        def ler_definicao(definicao) -> Tuple[str, Dict[str, Any], bool]:
+            if definicao.id() not in definicoes:
+                definicoes[definicao.id()] = (
+                    definicao.Name,
+                    ifcopenshell.util.element.get_property_definition(definicao),
+                    definicao.is_a("IfcElementQuantity"),
+                )
+            return definicoes[definicao.id()]
+        
+        for rel in self.ifc_file.by_type("IfcRelDefinesByProperties"):
+            definicao = rel.RelatingPropertyDefinition
+            # IFC4 permite um IfcPropertySetDefinitionSet (lista de definições)
+            definicoes_rel = definicao if isinstance(definicao, (list, tuple)) else [definicao]
+            for definicao in definicoes_rel:
+                if definicao is None or not definicao.is_a("IfcPropertySetDefinition"):
+                    continue
+                for objeto in rel.RelatedObjects:
+                    psets_ocorrencia.setdefault(objeto.id(), []).append(ler_definicao(definicao))
+        
+        for rel in self.ifc_file.by_type("IfcRelDefinesByType"):
+            tipo = rel.RelatingType
+            if tipo.id() not in psets_tipo:
+                psets_tipo[tipo.id()] = [ler_definicao(d) for d in (tipo.HasPropertySets or [])]
+            for objeto in rel.RelatedObjects:
+                # Assim como get_type, considera apenas o primeiro tipo atribuído
+                tipo_por_elemento.setdefault(objeto.id(), tipo.id())
+        
+        palavras_volume = ['volume', 'vol', 'cubic']
+        palavras_pavimento = ['level', 'floor', 'pavimento', 'andar']
+        eh_volume = {}
+        eh_pavimento = {}
+        
+        indice = {}
+        for id_elemento in set(psets_ocorrencia) | set(tipo_por_elemento):
+            psets = {}
+            quantidades = {}
+            definicoes_elemento = psets_tipo.get(tipo_por_elemento.get(id_elemento), []) + psets_ocorrencia.get(id_elemento, [])
+            for nome_pset, propriedades, eh_qto in definicoes_elemento:
+                if nome_pset in psets:
+                    psets[nome_pset] = {**psets[nome_pset], **propriedades}
+                else:
+                    psets[nome_pset] = propriedades
+                if eh_qto:
+                    quantidades.update(
+                        (nome, valor) for nome, valor in propriedades.items()
+                        if nome != "id" and isinstance(valor, (int, float))
+                    )
+            
+            volume = 0
+            pavimento = None
+            for propriedades in psets.values():
+                for nome, valor in propriedades.items():
+                    if nome not in eh_volume:
+                        nome_lower = nome.lower()
+                        eh_volume[nome] = any(keyword in nome_lower for keyword in palavras_volume)
+                        eh_pavimento[nome] = any(keyword in nome_lower for keyword in palavras_pavimento)
+                    if not volume and eh_volume[nome] and isinstance(valor, (int, float)) and valor > 0:
+                        volume = valor
+                    if pavimento is None and eh_pavimento[nome] and isinstance(valor, str):
+                        pavimento = valor
+            
+            indice[id_elemento] = {
+                "volume": volume,
+                "pavimento": pavimento,
+                "quantidades": quantidades
+            }
+        
+        return indice
+    
     def _calcular_volume_geometrico(self, elemento) -> float:
         """Calcula volume usando geometria IFC"""
         try:
-            # Isso requereria ifcopenshell.geom para processamento geométrico
-            # Para simplificar, vamos estimar baseado no tipo
-            return 0
+            return self._obter_volumes_geometricos().get(elemento.id(), 0)
             
         except Exception:
             return 0
     
+    def _obter_volumes_geometricos(self) -> Dict[int, float]:
+        """Retorna os volumes geométricos, tesselando o modelo no primeiro uso"""
+        if self._volumes_geometricos is None:
+            self._volumes_geometricos = self._calcular_volumes_geometricos()
+        return self._volumes_geometricos
+    
+    def _calcular_volumes_geometricos(self, ids: Optional[set] = None) -> Dict[int, float]:
+        """
+        Calcula o volume de todos os elementos sem volume nas propriedades
+        
+        Os elementos são tesselados em uma única passada pelo iterador de
+        geometria do IfcOpenShell, usando várias threads.
+        
+        Args:
+            ids: Restringe o cálculo a estes ids de elementos (todos quando omitido)
+            
+        Returns:
+            Dicionário id do elemento -> volume em m³
+        """
+        if not GEOMETRIA_DISPONIVEL or not self.config["geometria"]["calcular_volume"]:
+            return {}
+        
+        indice = self._obter_indice_propriedades()
+        elementos = {}
+        for tipo in self.TIPOS_ESTRUTURAIS:
+            for elemento in self.ifc_file.by_type(tipo):
+                if ids is not None and elemento.id() not in ids:
+                    continue
+                dados = indice.get(elemento.id())
+                if (not dados or not dados["volume"]) and elemento.Representation:
+                    elementos[elemento.id()] = elemento
+        
+        if not elementos:
+            return {}
+        
+        print(f"📐 Calculando volume geométrico de {len(elementos)} elementos...")
+        
+        volumes = {}
+        try:
+            settings = ifcopenshell.geom.settings()
+            for shape in ifcopenshell.geom.iterate(
+                settings,
+                self.ifc_file,
+                self.config["geometria"]["threads"],
+                include=list(elementos.values()),
+            ):
+                # A geometria é gerada em unidades SI, então o volume já está em m³
+                volumes[shape.id] = ifcopenshell.util.shape.get_volume(shape.geometry)
+        except Exception as e:
+            print(f"⚠️ Erro ao calcular volumes geométricos: {str(e)}")
+        
+        return volumes
+    
     def _estimar_volume_basico(self, elemento) -> float:
         """Estimativa básica de volume baseada em tipo - valores realistas"""
         tipo = elemento.is_a()
@@ -398,35 +795,13 @@ class IFCSteelExtractor:
                 # Para valores pequenos, assumir que já estão em m³
                 return volume
     
-    def _calcular_peso_aco(self, volume_concreto: float, tipo_estrutural: str) -> float:
-        """
-        Calcula peso de aço baseado no volume de concreto
-        
-        Args:
-            volume_concreto: Volume de concreto em m³
-            tipo_estrutural: Tipo do elemento estrutural
-            
-        Returns:
-            Peso de aço em kg
-        """
-        taxa_armadura = self.config["taxas_armadura"].get(
-            tipo_estrutural, 
-            self.config["taxas_armadura"]["default"]
-        )
-        
-        return volume_concreto * taxa_armadura
-    
     def _obter_pavimento(self, elemento) -> str:
         """Obtém o pavimento do elemento"""
         try:
             # Tentar obter de propriedades
-            psets = ifcopenshell.util.element.get_psets(elemento)
-            
-            for pset_name, pset_data in psets.items():
-                for prop_name, prop_value in pset_data.items():
-                    if any(keyword in prop_name.lower() for keyword in ['level', 'floor', 'pavimento', 'andar']):
-                        if isinstance(prop_value, str):
-                            return prop_value
+            dados = self._obter_indice_propriedades().get(elemento.id())
+            if dados and dados["pavimento"] is not None:
+                return dados["pavimento"]
             
             # Tentar obter do spatial container
             container = ifcopenshell.util.element.get_container(elemento)
@@ -438,98 +813,21 @@ class IFCSteelExtractor:
         except Exception:
             return "Pavimento Desconhecido"
     
-    def _distribuir_bitolas(self, peso_total: float, tipo_estrutural: str) -> Dict[str, float]:
-        """
-        Distribui o peso total pelas diferentes bitolas
-        
-        Args:
-            peso_total: Peso total de aço em kg
-            tipo_estrutural: Tipo do elemento estrutural
-            
-        Returns:
-            Distribuição por bitola
-        """
-        distribuicao = self.config["distribuicao_bitolas"].get(
-            tipo_estrutural,
-            self.config["distribuicao_bitolas"]["default"]
-        )
-        
-        bitolas = {}
-        for bitola, percentual in distribuicao.items():
-            bitolas[bitola] = round(peso_total * percentual, 2)
-        
-        return bitolas
-    
-    def _calcular_custo_concreto(self, volume_concreto: float) -> Dict[str, float]:
-        """
-        Calcula o custo do concreto baseado no volume e preços SINAPI
-        
-        Args:
-            volume_concreto: Volume de concreto em m³
-            
-        Returns:
-            Dicionário com informações de custo
-        """
-        preco_unitario = self.config["precos_sinapi"]["concreto_fck25"]
-        custo_total = volume_concreto * preco_unitario
-        
-        return {
-            "volume_m3": round(volume_concreto, 3),
-            "preco_unitario": preco_unitario,
-            "custo_total": round(custo_total, 2),
-            "data_referencia": self.config["precos_sinapi"]["data_referencia"]
-        }
-    
-    def _calcular_custo_armacao(self, bitolas: Dict[str, float], tipo_estrutural: str) -> Dict[str, Any]:
-        """
-        Calcula o custo da armação baseado nas bitolas e peso
-        
-        Args:
-            bitolas: Dicionário com peso por bitola
-            tipo_estrutural: Tipo do elemento estrutural
-            
-        Returns:
-            Dicionário com informações de custo da armação
-        """
+    def _obter_preco_bitola(self, bitola: str, tipo_estrutural: str) -> float:
+        """Obtém o preço em R$/kg da bitola, considerando casos especiais"""
         precos_armacao = self.config["precos_sinapi"]["armacao_aco"]
-        custo_total = 0
-        custo_por_bitola = {}
-        peso_total = 0
         
-        for bitola, peso in bitolas.items():
-            if peso <= 0:
-                continue
-                
-            peso_total += peso
-            
-            # Buscar preço da bitola, considerando casos especiais
-            preco_kg = None
-            
-            # Caso especial para sapatas com bitola 8mm
-            if tipo_estrutural == "sapatas" and bitola == "8.0 mm":
-                preco_kg = precos_armacao.get("8.0 mm sapata", precos_armacao.get("8.0 mm", 15.05))
-            else:
-                preco_kg = precos_armacao.get(bitola, 0)
-            
-            # Se não encontrar o preço exato, usar preço médio baseado no diâmetro
-            if preco_kg == 0:
-                preco_kg = self._obter_preco_medio_bitola(bitola)
-            
-            custo_bitola = peso * preco_kg
-            custo_total += custo_bitola
-            
-            custo_por_bitola[bitola] = {
-                "peso_kg": round(peso, 2),
-                "preco_unitario": preco_kg,
-                "custo_total": round(custo_bitola, 2)
-            }
+        # Caso especial para sapatas com bitola 8mm
+        if tipo_estrutural == "sapatas" and bitola == "8.0 mm":
+            preco_kg = precos_armacao.get("8.0 mm sapata", precos_armacao.get("8.0 mm", 15.05))
+        else:
+            preco_kg = precos_armacao.get(bitola, 0)
         
-        return {
-            "peso_total_kg": round(peso_total, 2),
-            "custo_total": round(custo_total, 2),
-            "custo_por_bitola": custo_por_bitola,
-            "data_referencia": self.config["precos_sinapi"]["data_referencia"]
-        }
+        # Se não encontrar o preço exato, usar preço médio baseado no diâmetro
+        if preco_kg == 0:
+            preco_kg = self._obter_preco_medio_bitola(bitola)
+        
+        return preco_kg
     
     def _obter_preco_medio_bitola(self, bitola: str) -> float:
         """
@@ -588,10 +886,186 @@ class IFCSteelExtractor:
         except:
             return 13.5  # Preço médio de fallback
     
-    def gerar_dados_dashboard(self) -> Dict[str, Any]:
+    def _tabelas_custo(self, tipos: List[str]) -> Tuple[List[str], Any, Any, Any, List[List[int]]]:
+        """
+        Monta as tabelas de custo para os tipos estruturais informados
+        
+        As taxas, distribuições e preços são resolvidos uma única vez por par
+        (tipo, bitola), e não por elemento.
+        
+        Returns:
+            Bitolas (ordenadas por diâmetro), taxa de armadura por tipo (t),
+            distribuição por tipo e bitola (t x b), preço por tipo e bitola (t x b)
+            e, para cada tipo, os índices das bitolas na ordem da sua distribuição
+        """
+        taxas = self.config["taxas_armadura"]
+        distribuicoes = self.config["distribuicao_bitolas"]
+        distribuicoes_tipo = [distribuicoes.get(tipo, distribuicoes["default"]) for tipo in tipos]
+        bitolas = sorted(
+            {bitola for distribuicao in distribuicoes_tipo for bitola in distribuicao},
+            key=lambda x: float(x.split()[0])
+        )
+        
+        taxa = np.array([taxas.get(tipo, taxas["default"]) for tipo in tipos], dtype=np.float64)
+        distribuicao = np.zeros((len(tipos), len(bitolas)))
+        preco = np.zeros((len(tipos), len(bitolas)))
+        for i, (tipo, distribuicao_tipo) in enumerate(zip(tipos, distribuicoes_tipo)):
+            for j, bitola in enumerate(bitolas):
+                distribuicao[i, j] = distribuicao_tipo.get(bitola, 0)
+                preco[i, j] = self._obter_preco_bitola(bitola, tipo)
+        ordens = [[bitolas.index(bitola) for bitola in distribuicao_tipo] for distribuicao_tipo in distribuicoes_tipo]
+        
+        return bitolas, taxa, distribuicao, preco, ordens
+    
+    def calcular_custos(self, volumes: Iterable[float], tipos: Iterable[str]) -> Dict[str, Any]:
+        """
+        Calcula pesos e custos de todos os elementos de uma vez
+        
+        É o único cálculo de pesos e custos do extrator: tanto os registros
+        (ver _aplicar_custos) quanto os dados colunares são derivados dele.
+        Como só depende dos volumes e tipos, basta alterar self.config e chamar
+        novamente para obter os custos com uma nova tabela de preços, sem
+        reprocessar o arquivo IFC.
+        
+        Args:
+            volumes: Volume de concreto de cada elemento em m³
+            tipos: Tipo estrutural de cada elemento
+            
+        Returns:
+            Dicionário com "bitolas", os arrays "peso_aco_total", "pesos_bitola"
+            (n x b), "precos_bitola" (n x b), "custos_bitola" (n x b),
+            "peso_armacao", "custo_concreto" e "custo_armacao" e, em
+            "ordens_bitola", os índices das bitolas de cada elemento na ordem
+            da sua distribuição
+        """
+        volumes = np.asarray(volumes, dtype=np.float64)
+        tipos, indices = np.unique(np.asarray(tipos, dtype=str), return_inverse=True)
+        bitolas, taxa, distribuicao, preco, ordens = self._tabelas_custo(tipos.tolist())
+        
+        peso_aco = volumes * taxa[indices]
+        pesos_bitola = np.round(peso_aco[:, None] * distribuicao[indices], 2)
+        precos_bitola = preco[indices]
+        # Bitolas sem peso não entram na armação
+        armadas = pesos_bitola > 0
+        custos_bitola = np.where(armadas, pesos_bitola * precos_bitola, 0)
+        
+        return {
+            "bitolas": bitolas,
+            "peso_aco_total": np.round(peso_aco, 2),
+            "pesos_bitola": pesos_bitola,
+            "precos_bitola": precos_bitola,
+            "custos_bitola": np.round(custos_bitola, 2),
+            "peso_armacao": np.round(np.where(armadas, pesos_bitola, 0).sum(axis=1), 2),
+            "custo_concreto": np.round(volumes * self.config["precos_sinapi"]["concreto_fck25"], 2),
+            "custo_armacao": np.round(custos_bitola.sum(axis=1), 2),
+            "ordens_bitola": [ordens[i] for i in indices]
+        }
+    
+    def _aplicar_custos(self, elementos: Iterable[Dict[str, Any]],
+                        tamanho_lote: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Acrescenta pesos, bitolas e custos aos registros extraídos
+        
+        Os registros são agrupados em lotes de tamanho_lote e cada lote passa
+        uma única vez por calcular_custos. Os custos usam o volume exato, que
+        só então é arredondado no registro.
+        
+        Args:
+            elementos: Registros de _processar_elemento
+            tamanho_lote: Quantidade de registros calculados de cada vez
+            
+        Yields:
+            Registro com "peso_aco_total", "bitolas", "custo_concreto" e "custo_armacao"
+        """
+        precos = self.config["precos_sinapi"]
+        elementos = iter(elementos)
+        while True:
+            lote = list(itertools.islice(elementos, tamanho_lote))
+            if not lote:
+                return
+            
+            custos = self.calcular_custos(
+                [elemento["volume_concreto"] for elemento in lote],
+                [elemento["tipo_estrutural"] for elemento in lote]
+            )
+            bitolas = custos["bitolas"]
+            valores = {
+                nome: custos[nome].tolist() for nome in (
+                    "peso_aco_total", "pesos_bitola", "precos_bitola", "custos_bitola",
+                    "peso_armacao", "custo_concreto", "custo_armacao"
+                )
+            }
+            
+            for i, elemento in enumerate(lote):
+                ordem = custos["ordens_bitola"][i]
+                pesos = valores["pesos_bitola"][i]
+                volume_concreto = round(elemento["volume_concreto"], 3)
+                yield {
+                    **elemento,
+                    "volume_concreto": volume_concreto,
+                    "peso_aco_total": valores["peso_aco_total"][i],
+                    "bitolas": {bitolas[j]: pesos[j] for j in ordem},
+                    "custo_concreto": {
+                        "volume_m3": volume_concreto,
+                        "preco_unitario": precos["concreto_fck25"],
+                        "custo_total": valores["custo_concreto"][i],
+                        "data_referencia": precos["data_referencia"]
+                    },
+                    "custo_armacao": {
+                        "peso_total_kg": valores["peso_armacao"][i],
+                        "custo_total": valores["custo_armacao"][i],
+                        "custo_por_bitola": {
+                            bitolas[j]: {
+                                "peso_kg": pesos[j],
+                                "preco_unitario": valores["precos_bitola"][i][j],
+                                "custo_total": valores["custos_bitola"][i][j]
+                            }
+                            for j in ordem if pesos[j] > 0
+                        },
+                        "data_referencia": precos["data_referencia"]
+                    }
+                }
+    
+    def recalcular_custos(self, colunas: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Recalcula pesos e custos de dados colunares com a configuração atual
+        
+        Os custos partem da coluna volume_concreto, arredondada em 3 casas,
+        então podem diferir em centavos dos calculados na extração.
+        
+        Args:
+            colunas: Colunas de montar_colunas ou carregar_dados_colunares
+            
+        Returns:
+            Novas colunas, com as de peso e custo substituídas
+        """
+        custos = self.calcular_custos(colunas["volume_concreto"], colunas["tipo_estrutural"])
+        
+        novas_colunas = {
+            nome: valores for nome, valores in colunas.items()
+            if not nome.startswith((PREFIXO_PESO_BITOLA, PREFIXO_CUSTO_BITOLA))
+        }
+        for nome in ("peso_aco_total", "custo_concreto", "custo_armacao"):
+            novas_colunas[nome] = custos[nome]
+        for j, bitola in enumerate(custos["bitolas"]):
+            novas_colunas[PREFIXO_PESO_BITOLA + bitola] = custos["pesos_bitola"][:, j]
+            novas_colunas[PREFIXO_CUSTO_BITOLA + bitola] = custos["custos_bitola"][:, j]
+        
+        return novas_colunas
+    
+    def gerar_dados_dashboard(self, processos: int = 1,
+                              registros: Optional[List[Dict[str, Any]]] = None,
+                              arquivo_cache: Optional[str] = None) -> Dict[str, Any]:
         """
         Gera dados formatados para o dashboard
         
+        Args:
+            processos: Número de processos usados na extração (1 = serial)
+            registros: Lista opcional que recebe os registros de cada elemento,
+                por exemplo para salvar_dados_colunares
+            arquivo_cache: Banco SQLite para a extração incremental
+                (ver iterar_elementos_incremental)
+            
         Returns:
             Dicionário com dados para o dashboard
         """
@@ -600,16 +1074,19 @@ class IFCSteelExtractor:
         # Extrair informações do projeto
         info_projeto = self.extrair_info_projeto()
         
-        # Extrair elementos estruturais
-        elementos = self.extrair_elementos_estruturais()
+        # Extrair e agregar elementos estruturais de forma incremental
+        if arquivo_cache:
+            elementos = self.iterar_elementos_incremental(arquivo_cache, processos)
+        else:
+            elementos = self.iterar_elementos_estruturais(processos)
+        if registros is not None:
+            elementos = _acumular(elementos, registros)
+        dados_processados = self._processar_dados_para_dashboard(elementos)
         
-        if not elementos:
+        if not dados_processados["resumo"]["elementos_total"]:
             print("⚠️ Nenhum elemento estrutural encontrado")
             return self._criar_dados_vazio()
         
-        # Processar dados
-        dados_processados = self._processar_dados_para_dashboard(elementos)
-        
         # Estruturar resposta
         dados_dashboard = {
             "projeto": info_projeto["nome"],
@@ -621,20 +1098,37 @@ class IFCSteelExtractor:
         print("✅ Dados do dashboard gerados com sucesso")
         return dados_dashboard
     
-    def _processar_dados_para_dashboard(self, elementos: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Processa elementos para formato do dashboard"""
+    def _processar_dados_para_dashboard(self, elementos: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Processa elementos para formato do dashboard
         
-        # Calcular resumo geral
-        peso_total = sum(elem["peso_aco_total"] for elem in elementos)
-        volume_concreto_total = sum(elem["volume_concreto"] for elem in elementos)
-        custo_concreto_total = sum(elem["custo_concreto"]["custo_total"] for elem in elementos)
-        custo_armacao_total = sum(elem["custo_armacao"]["custo_total"] for elem in elementos)
-        custo_total_geral = custo_concreto_total + custo_armacao_total
-        pavimentos = set(elem["pavimento"] for elem in elementos)
+        Os elementos são percorridos uma única vez, então aceita tanto uma lista
+        quanto o gerador de iterar_elementos_estruturais.
+        """
         
-        # Agrupar por pavimento
+        peso_total = 0
+        volume_concreto_total = 0
+        custo_concreto_total = 0
+        custo_armacao_total = 0
+        total_elementos = 0
+        pavimentos = set()
         por_pavimento = {}
+        por_bitola = {}
+        por_tipo = {}
+        
         for elemento in elementos:
+            custo_concreto = elemento["custo_concreto"]["custo_total"]
+            custo_armacao = elemento["custo_armacao"]["custo_total"]
+            
+            # Calcular resumo geral
+            peso_total += elemento["peso_aco_total"]
+            volume_concreto_total += elemento["volume_concreto"]
+            custo_concreto_total += custo_concreto
+            custo_armacao_total += custo_armacao
+            total_elementos += 1
+            pavimentos.add(elemento["pavimento"])
+            
+            # Agrupar por pavimento
             pav = elemento["pavimento"]
             if pav not in por_pavimento:
                 por_pavimento[pav] = {
@@ -649,22 +1143,18 @@ class IFCSteelExtractor:
             
             por_pavimento[pav]["peso_aco"] += elemento["peso_aco_total"]
             por_pavimento[pav]["volume_concreto"] += elemento["volume_concreto"]
-            por_pavimento[pav]["custo_concreto"] += elemento["custo_concreto"]["custo_total"]
-            por_pavimento[pav]["custo_armacao"] += elemento["custo_armacao"]["custo_total"]
-            por_pavimento[pav]["custo_total"] += (elemento["custo_concreto"]["custo_total"] + elemento["custo_armacao"]["custo_total"])
+            por_pavimento[pav]["custo_concreto"] += custo_concreto
+            por_pavimento[pav]["custo_armacao"] += custo_armacao
+            por_pavimento[pav]["custo_total"] += (custo_concreto + custo_armacao)
             por_pavimento[pav]["elementos"] += 1
-        
-        # Agrupar por bitola
-        por_bitola = {}
-        for elemento in elementos:
+            
+            # Agrupar por bitola
             for bitola, peso in elemento["bitolas"].items():
                 if bitola not in por_bitola:
                     por_bitola[bitola] = 0
                 por_bitola[bitola] += peso
-        
-        # Agrupar por tipo de elemento
-        por_tipo = {}
-        for elemento in elementos:
+            
+            # Agrupar por tipo de elemento
             tipo = elemento["tipo_estrutural"]
             if tipo not in por_tipo:
                 por_tipo[tipo] = {
@@ -679,11 +1169,13 @@ class IFCSteelExtractor:
             
             por_tipo[tipo]["peso_aco"] += elemento["peso_aco_total"]
             por_tipo[tipo]["volume_concreto"] += elemento["volume_concreto"]
-            por_tipo[tipo]["custo_concreto"] += elemento["custo_concreto"]["custo_total"]
-            por_tipo[tipo]["custo_armacao"] += elemento["custo_armacao"]["custo_total"]
-            por_tipo[tipo]["custo_total"] += (elemento["custo_concreto"]["custo_total"] + elemento["custo_armacao"]["custo_total"])
+            por_tipo[tipo]["custo_concreto"] += custo_concreto
+            por_tipo[tipo]["custo_armacao"] += custo_armacao
+            por_tipo[tipo]["custo_total"] += (custo_concreto + custo_armacao)
             por_tipo[tipo]["elementos"] += 1
         
+        custo_total_geral = custo_concreto_total + custo_armacao_total
+        
         return {
             "resumo": {
                 "peso_total": round(peso_total, 2),
@@ -695,7 +1187,7 @@ class IFCSteelExtractor:
                 "data_referencia_precos": self.config["precos_sinapi"]["data_referencia"],
                 "pavimentos": len(pavimentos),
                 "bitolas_diferentes": len(por_bitola),
-                "elementos_total": len(elementos)
+                "elementos_total": total_elementos
             },
             "por_pavimento": [
                 {
@@ -732,6 +1224,107 @@ class IFCSteelExtractor:
             ]
         }
     
+    def gerar_dados_dashboard_colunares(self, colunas: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Gera dados do dashboard a partir de dados colunares
+        
+        Útil junto com recalcular_custos para atualizar o dashboard com uma nova
+        tabela de preços sem reprocessar o arquivo IFC.
+        
+        Args:
+            colunas: Colunas de montar_colunas, carregar_dados_colunares ou recalcular_custos
+            
+        Returns:
+            Dicionário com dados para o dashboard
+        """
+        if not len(colunas["guid"]):
+            return self._criar_dados_vazio()
+        
+        info_projeto = self.extrair_info_projeto()
+        return {
+            "projeto": info_projeto["nome"],
+            "data_atualizacao": info_projeto["data_extracao"],
+            "arquivo_ifc": info_projeto["arquivo"],
+            "volume_aco": self._processar_colunas_para_dashboard(colunas)
+        }
+    
+    def _processar_colunas_para_dashboard(self, colunas: Dict[str, Any]) -> Dict[str, Any]:
+        """Versão de _processar_dados_para_dashboard que agrega colunas NumPy"""
+        peso_aco = np.asarray(colunas["peso_aco_total"], dtype=np.float64)
+        volume_concreto = np.asarray(colunas["volume_concreto"], dtype=np.float64)
+        custo_concreto = np.asarray(colunas["custo_concreto"], dtype=np.float64)
+        custo_armacao = np.asarray(colunas["custo_armacao"], dtype=np.float64)
+        
+        peso_total = float(peso_aco.sum())
+        custo_concreto_total = float(custo_concreto.sum())
+        custo_armacao_total = float(custo_armacao.sum())
+        
+        def agrupar(chaves):
+            # Grupos na ordem da primeira ocorrência, como no processamento por elemento
+            nomes, primeiros, indices = np.unique(
+                np.asarray(chaves, dtype=str), return_index=True, return_inverse=True
+            )
+            ordem = np.argsort(primeiros, kind="stable")
+            somas = [
+                np.bincount(indices, weights=valores, minlength=len(nomes))[ordem]
+                for valores in (peso_aco, volume_concreto, custo_concreto, custo_armacao)
+            ]
+            contagem = np.bincount(indices, minlength=len(nomes))[ordem]
+            return [
+                {
+                    "nome": str(nomes[i]),
+                    "peso_aco": round(float(somas[0][k]), 2),
+                    "volume_concreto": round(float(somas[1][k]), 3),
+                    "custo_concreto": round(float(somas[2][k]), 2),
+                    "custo_armacao": round(float(somas[3][k]), 2),
+                    "custo_total": round(float(somas[2][k] + somas[3][k]), 2),
+                    "elementos": int(contagem[k])
+                }
+                for k, i in enumerate(ordem)
+            ]
+        
+        por_pavimento = agrupar(colunas["pavimento"])
+        por_tipo = agrupar(colunas["tipo_estrutural"])
+        for dados in por_tipo:
+            dados["tipo"] = dados.pop("nome")
+            dados["percentual"] = round((dados["peso_aco"] / peso_total) * 100, 1) if peso_total > 0 else 0
+        
+        por_bitola = [
+            (nome[len(PREFIXO_PESO_BITOLA):], float(np.sum(valores)))
+            for nome, valores in colunas.items() if nome.startswith(PREFIXO_PESO_BITOLA)
+        ]
+        
+        return {
+            "resumo": {
+                "peso_total": round(peso_total, 2),
+                "volume_concreto_total": round(float(volume_concreto.sum()), 3),
+                "custo_concreto_total": round(custo_concreto_total, 2),
+                "custo_armacao_total": round(custo_armacao_total, 2),
+                "custo_total_obra": round(custo_concreto_total + custo_armacao_total, 2),
+                "preco_unitario_concreto": self.config["precos_sinapi"]["concreto_fck25"],
+                "data_referencia_precos": self.config["precos_sinapi"]["data_referencia"],
+                "pavimentos": len(por_pavimento),
+                "bitolas_diferentes": len(por_bitola),
+                "elementos_total": len(peso_aco)
+            },
+            "por_pavimento": sorted(por_pavimento, key=lambda x: x["nome"]),
+            "por_bitola": [
+                {
+                    "bitola": bitola,
+                    "peso": round(peso, 2),
+                    "percentual": round((peso / peso_total) * 100, 1) if peso_total > 0 else 0
+                }
+                for bitola, peso in sorted(por_bitola, key=lambda x: float(x[0].split()[0]))
+            ],
+            "por_elemento": [
+                {chave: dados[chave] for chave in (
+                    "tipo", "peso_aco", "volume_concreto", "custo_concreto",
+                    "custo_armacao", "custo_total", "elementos", "percentual"
+                )}
+                for dados in sorted(por_tipo, key=lambda x: x["peso_aco"], reverse=True)
+            ]
+        }
+    
     def _criar_dados_vazio(self) -> Dict[str, Any]:
         """Cria estrutura de dados vazia"""
         info_projeto = self.extrair_info_projeto()
@@ -781,6 +1374,96 @@ class IFCSteelExtractor:
             print(f"❌ Erro ao salvar JSON: {str(e)}")
             return False
     
+    def montar_colunas(self, elementos: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Converte os registros dos elementos em colunas tipadas
+        
+        Os pesos e custos são copiados dos campos já calculados nos registros
+        (ver _aplicar_custos), então as colunas têm os mesmos valores que os
+        registros e o dashboard. As bitolas viram duas colunas cada (peso em
+        kg e custo em R$), com 0 para os elementos que não usam a bitola.
+        
+        Args:
+            elementos: Registros gerados por iterar_elementos_estruturais
+            
+        Returns:
+            Dicionário nome da coluna -> array NumPy
+        """
+        elementos = list(elementos)
+        bitolas = sorted(
+            {bitola for elemento in elementos for bitola in elemento["bitolas"]},
+            key=lambda x: float(x.split()[0])
+        )
+        
+        colunas = {}
+        for nome in COLUNAS_TEXTO:
+            colunas[nome] = np.array([elemento[nome] or "" for elemento in elementos], dtype=str)
+        colunas["volume_concreto"] = np.array([e["volume_concreto"] for e in elementos], dtype=np.float64)
+        colunas["peso_aco_total"] = np.array([e["peso_aco_total"] for e in elementos], dtype=np.float64)
+        colunas["custo_concreto"] = np.array(
+            [e["custo_concreto"]["custo_total"] for e in elementos], dtype=np.float64
+        )
+        colunas["custo_armacao"] = np.array(
+            [e["custo_armacao"]["custo_total"] for e in elementos], dtype=np.float64
+        )
+        
+        for bitola in bitolas:
+            colunas[PREFIXO_PESO_BITOLA + bitola] = np.array(
+                [e["bitolas"].get(bitola, 0) for e in elementos], dtype=np.float64
+            )
+            colunas[PREFIXO_CUSTO_BITOLA + bitola] = np.array(
+                [
+                    e["custo_armacao"]["custo_por_bitola"].get(bitola, {}).get("custo_total", 0)
+                    for e in elementos
+                ],
+                dtype=np.float64
+            )
+        
+        return colunas
+    
+    def salvar_dados_colunares(self, elementos: Iterable[Dict[str, Any]], arquivo_saida: str) -> bool:
+        """
+        Salva os registros dos elementos em formato colunar
+        
+        O formato é escolhido pela extensão: .parquet e .arrow/.feather usam
+        pyarrow, .npz usa NumPy (compactado). Os arquivos .arrow/.feather são
+        gravados sem compressão para que carregar_dados_colunares possa
+        mapeá-los em memória sem cópia.
+        
+        Args:
+            elementos: Registros gerados por iterar_elementos_estruturais
+            arquivo_saida: Caminho do arquivo de saída
+            
+        Returns:
+            True se salvou com sucesso
+        """
+        extensao = Path(arquivo_saida).suffix.lower()
+        try:
+            if extensao == ".npz":
+                colunas = self.montar_colunas(elementos)
+                np.savez_compressed(arquivo_saida, **colunas)
+            elif extensao in (".parquet", ".arrow", ".feather"):
+                if pa is None:
+                    print("❌ pyarrow não instalado! Use a extensão .npz ou execute: pip install pyarrow")
+                    return False
+                
+                colunas = self.montar_colunas(elementos)
+                tabela = pa.table({nome: pa.array(valores) for nome, valores in colunas.items()})
+                if extensao == ".parquet":
+                    pyarrow.parquet.write_table(tabela, arquivo_saida)
+                else:
+                    pyarrow.feather.write_feather(tabela, arquivo_saida, compression="uncompressed")
+            else:
+                print(f"❌ Formato colunar não suportado: {extensao} (use .parquet, .arrow, .feather ou .npz)")
+                return False
+            
+            print(f"💾 Dados colunares salvos em: {arquivo_saida} ({len(colunas['guid'])} elementos)")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Erro ao salvar dados colunares: {str(e)}")
+            return False
+    
     def gerar_dashboard_html(self, dados: Dict[str, Any], 
                            template_html: str, 
                            arquivo_saida: str) -> bool:
@@ -848,6 +1531,109 @@ class IFCSteelExtractor:
         return html_content
 
 
+# Extrator usado por cada processo de trabalho em iterar_elementos_estruturais
+_extrator_processo: Optional[IFCSteelExtractor] = None
+
+
+def _inicializar_processo(arquivo_ifc: str, config: Dict[str, Any], project_info: Dict[str, Any],
+                          volumes_geometricos: Dict[int, float]) -> None:
+    """Abre o arquivo IFC uma vez por processo de trabalho"""
+    global _extrator_processo
+    _extrator_processo = IFCSteelExtractor(arquivo_ifc)
+    _extrator_processo.config = config
+    _extrator_processo.project_info = project_info
+    # A tesselação é feita uma única vez no processo principal
+    _extrator_processo._volumes_geometricos = volumes_geometricos
+    _extrator_processo.ifc_file = ifcopenshell.open(arquivo_ifc)
+
+
+def _processar_lote(tipo_ifc: str, ids: List[int]) -> List[Dict[str, Any]]:
+    """Processa um lote de elementos de um mesmo tipo dentro do processo de trabalho"""
+    resultados = []
+    for id_elemento in ids:
+        elemento = _extrator_processo.ifc_file.by_id(id_elemento)
+        dados_elemento = _extrator_processo._processar_elemento(elemento, tipo_ifc)
+        if dados_elemento:
+            resultados.append(dados_elemento)
+    return resultados
+
+
+def _acumular(elementos: Iterable[Dict[str, Any]], registros: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Repassa os elementos guardando cada um em registros"""
+    for elemento in elementos:
+        registros.append(elemento)
+        yield elemento
+
+
+def _hash_entidade(entidade, memo: Dict[int, str]) -> str:
+    """
+    Hash do conteúdo de uma entidade e das entidades que ela referencia
+    
+    Não depende dos ids (#n) do arquivo, que mudam a cada exportação.
+    """
+    id_entidade = entidade.id()
+    if id_entidade in memo:
+        return memo[id_entidade]
+    
+    def serializar(valor) -> str:
+        if isinstance(valor, ifcopenshell.entity_instance):
+            return _hash_entidade(valor, memo)
+        if isinstance(valor, tuple):
+            primeiro = valor
+            while isinstance(primeiro, tuple) and primeiro:
+                primeiro = primeiro[0]
+            # Listas de coordenadas e índices são serializadas de uma vez
+            if not isinstance(primeiro, ifcopenshell.entity_instance):
+                return repr(valor)
+            return "(" + ",".join(serializar(item) for item in valor) + ")"
+        return repr(valor)
+    
+    conteudo = entidade.is_a() + "(" + ",".join(serializar(valor) for valor in entidade) + ")"
+    resultado = hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+    # Entidades sem id (ex: IfcLengthMeasure) não são memorizadas
+    if id_entidade:
+        memo[id_entidade] = resultado
+    return resultado
+
+
+def carregar_dados_colunares(arquivo: str, colunas: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Carrega um arquivo gerado por IFCSteelExtractor.salvar_dados_colunares
+    
+    Arquivos .arrow/.feather são mapeados em memória, de modo que as colunas
+    numéricas são lidas sem cópia; no .npz apenas as colunas pedidas são
+    descompactadas. Filtros podem ser feitos com máscaras NumPy, ex:
+    
+        dados = carregar_dados_colunares("dados_aco.arrow")
+        vigas = dados["tipo_estrutural"] == "vigas"
+        peso_vigas = dados["peso_aco_total"][vigas].sum()
+    
+    Args:
+        arquivo: Caminho do arquivo .parquet, .arrow, .feather ou .npz
+        colunas: Nomes das colunas a carregar (todas quando omitido)
+        
+    Returns:
+        Dicionário nome da coluna -> array NumPy
+    """
+    extensao = Path(arquivo).suffix.lower()
+    
+    if extensao == ".npz":
+        with np.load(arquivo, allow_pickle=False) as dados:
+            return {nome: dados[nome] for nome in (colunas or dados.files)}
+    
+    if extensao not in (".parquet", ".arrow", ".feather"):
+        raise ValueError(f"Formato colunar não suportado: {extensao}")
+    if pa is None:
+        raise ImportError("pyarrow é necessário para carregar arquivos " + extensao)
+    
+    if extensao == ".parquet":
+        tabela = pyarrow.parquet.read_table(arquivo, columns=colunas, memory_map=True)
+    else:
+        tabela = pyarrow.feather.read_table(arquivo, columns=colunas, memory_map=True)
+    
+    return {nome: tabela.column(nome).to_numpy() for nome in tabela.column_names}
+
+
 def main():
     """Função principal para uso via linha de comando"""
     import argparse
@@ -857,6 +1643,11 @@ def main():
     parser.add_argument("-o", "--output", help="Arquivo JSON de saída", default="dados_aco.json")
     parser.add_argument("-t", "--template", help="Template HTML do dashboard")
     parser.add_argument("-d", "--dashboard", help="Arquivo HTML do dashboard final")
+    parser.add_argument("-p", "--processos", help="Número de processos para a extração", type=int, default=1)
+    parser.add_argument("--cache",
+                        help="Banco SQLite para reprocessar apenas os elementos novos ou alterados")
+    parser.add_argument("-c", "--colunar",
+                        help="Arquivo colunar por elemento (.parquet, .arrow, .feather ou .npz)")
     
     args = parser.parse_args()
     
@@ -869,13 +1660,19 @@ def main():
         sys.exit(1)
     
     # Gerar dados
-    dados = extrator.gerar_dados_dashboard()
+    registros = [] if args.colunar else None
+    dados = extrator.gerar_dados_dashboard(args.processos, registros, args.cache)
     
     # Salvar JSON
     if not extrator.salvar_dados_json(dados, args.output):
         print("❌ Erro ao salvar dados JSON")
         sys.exit(1)
     
+    # Salvar registros por elemento em formato colunar
+    if args.colunar and not extrator.salvar_dados_colunares(registros, args.colunar):
+        print("❌ Erro ao salvar dados colunares")
+        sys.exit(1)
+    
     # Gerar dashboard se template fornecido
     if args.template and args.dashboard:
         if not extrator.gerar_dashboard_html(dados, args.template, args.dashboard):
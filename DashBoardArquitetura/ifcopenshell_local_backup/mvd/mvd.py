@@ -3,6 +3,8 @@ import ifcopenshell.geom
 
 import itertools
 import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 import xlsxwriter
 import csv
@@ -106,6 +108,155 @@ def extract_data(mvd_node, ifc_data):
     return return_value
 
 
+# Rows of a rule that is combined with the rows of its preceding siblings are
+# kept up to this number for reuse, larger results are extracted again
+ROW_CACHE_SIZE = 1024
+
+
+def compile_rows(mvd_node):
+    """
+    Compiles an mvdXML Concept tree into a traversal plan. The plan is a
+    function yielding the same combinations as extract_data, one at a time
+    and in the same order. Combinations of several child rules are not
+    built as a list, so memory stays bounded on dense property data.
+
+    :param mvd_node: an mvdXML Concept
+    :return: function taking an IFC instance or an IFC value, returning an iterator of dictionaries
+
+    """
+    if len(mvd_node.nodes) == 0:
+        if mvd_node.tag == "AttributeRule":
+            def rows(ifc_data):
+                try:
+                    value = getattr(ifc_data, mvd_node.attribute)
+                except:
+                    value = "Invalid Attribute"
+                yield {mvd_node: value}
+        else:
+            def rows(ifc_data):
+                yield {mvd_node: ifc_data}
+        return rows
+
+    if mvd_node.tag == 'AttributeRule':
+        children = [compile_rows(child) for child in mvd_node.nodes]
+
+        def rows(ifc_data):
+            # Nothing is yielded inside the try, where the bare except would catch GeneratorExit
+            try:
+                values_from_attribute = getattr(ifc_data, mvd_node.attribute)
+                if values_from_attribute is None:
+                    values_from_attribute = "Nonexistent value"
+                    children_data = None
+                elif isinstance(values_from_attribute, (list, tuple)):
+                    children_data = values_from_attribute
+                else:
+                    children_data = (values_from_attribute,)
+            except:
+                values_from_attribute = "Invalid attribute rule"
+                children_data = None
+
+            if children_data is None:
+                yield {mvd_node: values_from_attribute}
+            elif len(children_data) == 0:
+                yield {mvd_node: 'empty data structure'}
+            else:
+                for child in children:
+                    for data in children_data:
+                        yield from child(data)
+        return rows
+
+    elif mvd_node.tag == 'EntityRule':
+        constraints = [child.attribute[0].c.replace("'", "") for child in mvd_node.nodes if child.tag == "Constraint"]
+        children = [compile_rows(child) for child in mvd_node.nodes if child.tag != "Constraint"]
+
+        def rows(ifc_data):
+            is_entity = isinstance(ifc_data, ifcopenshell.entity_instance)
+            # Avoid things like Quantities on Psets
+            if is_entity and not ifc_data.is_a(mvd_node.attribute):
+                return
+
+            # A matching constraint discards the child rules
+            for on_node in constraints:
+                if is_entity:
+                    matches = ifc_data[0] == type(ifc_data[0])(on_node)
+                else:
+                    matches = ifc_data == on_node
+                if matches:
+                    yield {mvd_node: ifc_data}
+                    return
+
+            if children:
+                yield from combine_rows(children, ifc_data, 0, {}, [None] * len(children))
+        return rows
+
+    def rows(ifc_data):
+        return iter(())
+    return rows
+
+
+def combine_rows(children, ifc_data, index, row, cache):
+    """
+    Lazy equivalent of map(merge_dictionaries, itertools.product(...))
+    over the rows of children[index:], each merged into row.
+    """
+    child_rows = cache[index]
+    if child_rows is None:
+        child_rows = children[index](ifc_data)
+        # The first child is only iterated once
+        if index:
+            child_rows = cache_rows(child_rows, cache, index)
+
+    if index == len(children) - 1:
+        for child_row in child_rows:
+            yield {**row, **child_row}
+    else:
+        for child_row in child_rows:
+            yield from combine_rows(children, ifc_data, index + 1, {**row, **child_row}, cache)
+
+
+def cache_rows(rows, cache, index):
+    """
+    Passes rows through, storing them in cache[index] once exhausted
+    unless there are more than ROW_CACHE_SIZE.
+    """
+    buffer = []
+    for row in rows:
+        if buffer is not None:
+            buffer.append(row)
+            if len(buffer) > ROW_CACHE_SIZE:
+                buffer = None
+        yield row
+    cache[index] = buffer
+
+
+def compile_extractor(mvd_node):
+    """
+    Compiles an mvdXML Concept tree into an extraction function.
+    The function returns the same combinations as extract_data, but the
+    tree is only traversed once, not once per IFC instance.
+
+    :param mvd_node: an mvdXML Concept
+    :return: function taking an IFC instance or an IFC value
+
+    """
+    rows = compile_rows(mvd_node)
+    return lambda ifc_data: list(rows(ifc_data))
+
+
+def get_rules_root(concept, entity):
+    """
+    Returns the rule tree of a Concept, with several top level rules
+    grouped under an EntityRule of the ConceptRoot entity.
+
+    :param concept: mvdXML Concept object
+    :param entity: applicable entity of the ConceptRoot
+    """
+    rules = concept.template().rules
+    if len(rules) > 1:
+        return ifcopenshell.mvd.rule("EntityRule", entity, list(rules))
+    return rules[0]
+
+
 def open_mvd(filename):
     """
     Open an mvdXML file.
@@ -156,6 +307,24 @@ def format_data_from_nodes(recurse_output):
         return []
 
 
+def format_rows(rows):
+    """
+    Same as format_data_from_nodes, consuming the combinations from an iterator.
+
+    :param rows: Combinations, as yielded by a function from compile_rows
+
+    """
+    rows = iter(rows)
+    first_rows = list(itertools.islice(rows, 2))
+    if len(first_rows) < 2:
+        return format_data_from_nodes(first_rows)
+
+    output = []
+    for resulting_dict in itertools.chain(first_rows, rows):
+        output.extend(resulting_dict.values())
+    return output
+
+
 def get_data_from_mvd(entities, tree, filtering=False):
     """
     Apply the recursive function on the entities to return
@@ -166,18 +335,23 @@ def get_data_from_mvd(entities, tree, filtering=False):
    :param filtering: Indicates whether the mvdXML tree is an applicability.
 
     """
-    filtered_entities = []
+    return extract_entities_data(entities, compile_rows(tree), filtering=filtering)
+
+
+def extract_entities_data(entities, rows, filtering=False):
+    """
+    Same as get_data_from_mvd, with a traversal plan from compile_rows.
+
+   :param entities: IFC instances to be processed.
+   :param rows: Compiled mvdXML Concept tree.
+   :param filtering: Indicates whether the mvdXML tree is an applicability.
+
+    """
     extracted_entities_data = {}
 
     for entity in entities:
         entity_id = entity.GlobalId
-        combinations = extract_data(tree, entity)
-        desired_results = []
-
-        for dictionary in combinations:
-            desired_results.append(dictionary)
-
-        output = format_data_from_nodes(desired_results)
+        output = format_rows(rows(entity))
 
         if filtering:
             if len(output):
@@ -188,6 +362,109 @@ def get_data_from_mvd(entities, tree, filtering=False):
     return extracted_entities_data
 
 
+def iter_data_from_mvd(entities, tree):
+    """
+    Lazily yields the combinations extracted from each entity, without
+    formatting them, so that dense data can be processed as a stream.
+
+    :param entities: IFC instances to be processed.
+    :param tree: mvdXML Concept instance tree root.
+    :return: Iterator of (GlobalId, dictionary) pairs
+
+    """
+    rows = compile_rows(tree)
+    for entity in entities:
+        global_id = entity.GlobalId
+        for row in rows(entity):
+            yield global_id, row
+
+
+def filter_entities(entities, tree):
+    """
+    Lazily yields the entities retained by an applicability, as with
+    get_data_from_mvd(filtering=True). At most two combinations are
+    extracted per entity, which is all the decision depends on.
+
+    :param entities: IFC instances to be processed.
+    :param tree: mvdXML Concept instance tree root of the applicability.
+
+    """
+    rows = compile_rows(tree)
+    for entity in entities:
+        if len(format_data_from_nodes(list(itertools.islice(rows(entity), 2)))):
+            yield entity
+
+
+# Entity instances can't be sent between processes, so workers return references:
+# the step id, or the type and value for type instances such as IfcLabel (id 0)
+EntityReference = namedtuple("EntityReference", ["id", "type", "value"])
+
+worker_file = None
+worker_extractors = None
+
+
+def initialize_worker(ifc_string, trees):
+    """
+    Loads the IFC file and compiles the Concept trees once per worker process.
+    """
+    global worker_file, worker_extractors
+    worker_file = ifcopenshell.file.from_string(ifc_string)
+    worker_extractors = [compile_rows(tree) for tree in trees]
+
+
+def extract_entities_data_in_worker(tree_index, entity_ids, filtering):
+    entities = [worker_file.by_id(entity_id) for entity_id in entity_ids]
+    extracted_entities_data = extract_entities_data(entities, worker_extractors[tree_index], filtering=filtering)
+    return [(global_id, encode_value(output)) for global_id, output in extracted_entities_data.items()]
+
+
+def encode_value(value):
+    if isinstance(value, ifcopenshell.entity_instance):
+        if value.id():
+            return EntityReference(value.id(), None, None)
+        return EntityReference(0, value.is_a(), value[0])
+    elif isinstance(value, (list, tuple)):
+        return type(value)(encode_value(v) for v in value)
+    return value
+
+
+def decode_value(ifc_file, value):
+    if isinstance(value, EntityReference):
+        if value.id:
+            return ifc_file.by_id(value.id)
+        # Type instances aren't added to the file, but compare equal to the originals
+        return ifc_file.create_entity(value.type, value.value)
+    elif isinstance(value, (list, tuple)):
+        return type(value)(decode_value(ifc_file, v) for v in value)
+    return value
+
+
+def extract_entities_data_in_pool(executor, processes, ifc_file, tree_index, entities, filtering=False):
+    """
+    Same as extract_entities_data, with the entities split into chunks
+    across the worker processes of executor.
+
+    :param executor: ProcessPoolExecutor set up with initialize_worker.
+    :param processes: Number of worker processes.
+    :param ifc_file: IFC file the entities belong to.
+    :param tree_index: Index of the Concept tree passed to initialize_worker.
+    :param entities: IFC instances to be processed.
+    :param filtering: Indicates whether the mvdXML tree is an applicability.
+
+    """
+    entity_ids = [entity.id() for entity in entities]
+    chunk_size = max(1, -(-len(entity_ids) // (processes * 4)))
+    chunks = [entity_ids[i:i + chunk_size] for i in range(0, len(entity_ids), chunk_size)]
+
+    extracted_entities_data = {}
+    for results in executor.map(
+        extract_entities_data_in_worker, itertools.repeat(tree_index), chunks, itertools.repeat(filtering)
+    ):
+        for global_id, output in results:
+            extracted_entities_data[global_id] = decode_value(ifc_file, output)
+    return extracted_entities_data
+
+
 def correct_for_export(all_data):
     """
     Process the data for spreadsheet export.
@@ -273,7 +550,7 @@ def export_to_csv(csv_name, concepts, all_data):
             f = writer.writerow(row_to_write)
 
 
-def get_data(mvd_concept, ifc_file, spreadsheet_export=True):
+def get_data(mvd_concept, ifc_file, spreadsheet_export=True, processes=1):
     """
     Use the majority of all the other functions to return the data
     queried by the mvdXML file in python format.
@@ -281,6 +558,8 @@ def get_data(mvd_concept, ifc_file, spreadsheet_export=True):
     :param mvd_concept: mvdXML Concept instance.
     :param ifc_file: IFC file from any schema.
     :param spreadsheet_export: The spreadsheet export is carried out when set to True.
+    :param processes: Number of worker processes the entities are split across.
+        Each worker loads its own copy of the IFC file, so this pays off on large models.
 
 
 
@@ -298,43 +577,52 @@ def get_data(mvd_concept, ifc_file, spreadsheet_export=True):
 
     # For each Concept(ConceptTemplate) in the ConceptRoot
     concepts = sorted(mvd_concept.concepts(), key=is_applicability, reverse=True)
-    all_data = []
-    counter = 0
-    for concept in concepts:
-        if is_applicability(concept):
-            filtering = True
-        else:
-            filtering = False
-
-        # Access all the Rules of the ConceptTemplate
-        if len(concept.template().rules) > 1:
-            attribute_rules = []
-            for rule in concept.template().rules:
-                attribute_rules.append(rule)
-            rules_root = ifcopenshell.mvd.rule("EntityRule", mvd_concept.entity, attribute_rules)
-        else:
-            rules_root = concept.template().rules[0]
+    # Access all the Rules of the ConceptTemplate
+    rules_roots = [get_rules_root(concept, mvd_concept.entity) for concept in concepts]
 
+    executor = None
+    if processes > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=processes, initializer=initialize_worker, initargs=(ifc_file.to_string(), rules_roots)
+        )
 
-        extracted_data = get_data_from_mvd(selected_entities, rules_root, filtering=filtering)
-        all_data.append(extracted_data)
+    all_data = []
+    counter = 0
+    try:
+        for concept, rules_root in zip(concepts, rules_roots):
+            if is_applicability(concept):
+                filtering = True
+            else:
+                filtering = False
 
-        if filtering:
-            filtered = 1
-            new_entities = []
-            for entity_id in all_data[counter].keys():
-                if len(all_data[counter][entity_id]) != 0:
-                    entity = ifc_file.by_id(entity_id)
-                    new_entities.append(entity)
-
-            selected_entities = new_entities
-            not_respecting_entities = [item for item in entities if item not in selected_entities]
-            for entity in entities:
-                val = 0
-                if entity in not_respecting_entities:
-                    val = 1
-                verification_matrix[entity.GlobalId].update({concept.name: val})
-        counter += 1
+            if executor:
+                extracted_data = extract_entities_data_in_pool(
+                    executor, processes, ifc_file, counter, selected_entities, filtering=filtering
+                )
+            else:
+                extracted_data = get_data_from_mvd(selected_entities, rules_root, filtering=filtering)
+            all_data.append(extracted_data)
+
+            if filtering:
+                filtered = 1
+                new_entities = []
+                for entity_id in all_data[counter].keys():
+                    if len(all_data[counter][entity_id]) != 0:
+                        entity = ifc_file.by_id(entity_id)
+                        new_entities.append(entity)
+
+                selected_entities = new_entities
+                # Compare step ids in a set rather than instances in a list
+                selected_ids = {entity.id() for entity in selected_entities}
+                for entity in entities:
+                    val = 0
+                    if entity.id() not in selected_ids:
+                        val = 1
+                    verification_matrix[entity.GlobalId].update({concept.name: val})
+            counter += 1
+    finally:
+        if executor:
+            executor.shutdown()
 
     all_data = correct_for_export(all_data)
 
@@ -1,5 +1,7 @@
+import array
 import builtins
 from dataclasses import dataclass
+import functools
 import itertools
 import numbers
 import sys
@@ -7,6 +9,7 @@ import re
 
 from collections import defaultdict
 import types
+from typing import Iterator
 
 from lark import Lark, Transformer, Tree, Token
 from lark.exceptions import UnexpectedToken, UnexpectedCharacters
@@ -326,6 +329,397 @@ def process_tree(filecontent, file_tree, with_progress, with_header=False):
         return ents
 
 
+# Tokens recognised by the fast parser, each optionally preceded by the
+# whitespace the grammar ignores. Only an unambiguous subset of the grammar
+# is covered: strings with whitespace other than spaces, binaries, complex
+# entity instances and similar rarities are left to the Lark grammar.
+FAST_TOKEN = re.compile(
+    r"[ \t\f\r\n]*(?:"
+    # 1: instance name
+    r"#([0-9]+)"
+    # 2: keyword
+    r"|([A-Z][0-9A-Z_]*)"
+    # 3: string, lark lexes a backslash followed by S, P or X as the start
+    # of a control directive so these are not accepted after \\
+    r"|'((?:[ -&(-\[\]-~]|''|\\\\(?![SPX])|\\S\\[ -&(-~]|\\P[A-Z]\\"
+    r"|\\X2\\(?:[0-9A-F]{4})*\\X0\\|\\X4\\(?:[0-9A-F]{8})*\\X0\\"
+    r"|\\X\\[0-9A-F]{2})*)'(?!')"
+    # 4: enumeration
+    r"|\.([A-Z][0-9A-Z_]*)\."
+    # 5: real
+    r"|([+-]?[0-9]+\.[0-9]*(?:E[+-]?[0-9]+)?)"
+    # 6: integer
+    r"|([+-]?[0-9]+)"
+    # 7: punctuation
+    r"|([(),;=$*])"
+    r")"
+)
+FAST_FILE_START = re.compile(r"[ \t\f\r\n]*ISO-10303-21;")
+FAST_FILE_END = re.compile(r"[ \t\f\r\n]*END-ISO-10303-21;[ \t\f\r\n]*\Z")
+
+
+class FastParserUnsupported(Exception):
+    """Raised when the fast parser encounters something it does not handle,
+    either a syntax error or a construct outside of its subset of the grammar.
+    The Lark parser is used in that case to obtain the outcome."""
+
+
+def fast_parse_parameters(content, pos):
+    """Parses a parameter list following an opening parenthesis.
+
+    Returns the parameters as a tuple, the offset after the closing
+    parenthesis and the offset of the last token that has a value, or
+    -1 if there is none. The values are identical to what the transformer
+    `T` produces from the Lark tree.
+    """
+    match = FAST_TOKEN.match
+    stack = []
+    values = []
+    keyword = None
+    last = -1
+
+    while True:
+        m = match(content, pos)
+        if m is None:
+            raise FastParserUnsupported()
+        pos = m.end()
+        i = m.lastindex
+
+        if i == 1:
+            value = int(m.group(1))
+            last = m.start(1)
+        elif i == 3:
+            value = m.group(3)
+            if value:
+                # an empty string contains no tokens
+                value = value.replace("''", "'")
+                last = m.start(3)
+        elif i == 7:
+            c = m.group(7)
+            if c == "$":
+                value = None
+            elif c == "*":
+                value = "*"
+            elif c == "(":
+                stack.append((values, keyword))
+                values, keyword = [], None
+                m = match(content, pos)
+                if m is None or m.group(7) != ")":
+                    continue
+                # empty list
+                pos = m.end()
+                values, keyword = stack.pop()
+                value = ()
+            else:
+                raise FastParserUnsupported()
+            if c != "(":
+                last = m.start(7)
+        elif i == 2:
+            # typed parameter
+            last = m.start(2)
+            stack.append((values, keyword))
+            values, keyword = [], m.group(2)
+            m = match(content, pos)
+            if m is None or m.group(7) != "(":
+                raise FastParserUnsupported()
+            pos = m.end()
+            continue
+        elif i == 4:
+            value = m.group(4)
+            last = m.start(4)
+        elif i == 5:
+            value = float(m.group(5))
+            last = m.start(5)
+        else:
+            value = int(m.group(6))
+            last = m.start(6)
+
+        # A parameter has been read, it is followed by a comma or closing
+        # parenthesis. The latter can complete multiple nested parameters.
+        while True:
+            values.append(value)
+            m = match(content, pos)
+            if m is None:
+                raise FastParserUnsupported()
+            pos = m.end()
+            c = m.group(7)
+            if c == "," and keyword is None:
+                break
+            if c != ")":
+                raise FastParserUnsupported()
+            if keyword is None:
+                value = tuple(values)
+            else:
+                value = IfcType(keyword, values[0])
+            if not stack:
+                return value, pos, last
+            values, keyword = stack.pop()
+
+
+def fast_expect(content, pos, group, value=None):
+    """Matches a token of the given group, and optionally value, at `pos`
+    and returns the offset after it."""
+    m = FAST_TOKEN.match(content, pos)
+    if m is None or m.lastindex != group or (value is not None and m.group(group) != value):
+        raise FastParserUnsupported()
+    return m.end()
+
+
+def fast_parse_record(content, pos):
+    """Parses the simple record that follows an instance name.
+
+    Returns the entity type, the attributes, the offset after the closing
+    semicolon and the offset of the last token that has a value.
+    """
+    pos = fast_expect(content, pos, 7, "=")
+    m = FAST_TOKEN.match(content, pos)
+    if m is None or m.lastindex != 2:
+        # complex entity instances are left to Lark
+        raise FastParserUnsupported()
+    pos = fast_expect(content, m.end(), 7, "(")
+    attributes, pos, last = fast_parse_parameters(content, pos)
+    pos = fast_expect(content, pos, 7, ";")
+    return m.group(2), list(attributes), pos, max(last, m.start(2))
+
+
+def fast_parse(filecontent, content, with_progress=False, with_tree=True, with_header=False):
+    """Parses a file without building a Lark parse tree.
+
+    The outcome is identical to parsing with the Lark grammar: the same
+    `entity_instance` records are returned and the same `DuplicateNameError`
+    is raised. Whenever the content is not understood, including on syntax
+    errors, `FastParserUnsupported` is raised so that the caller can fall
+    back to the Lark grammar for the diagnostics.
+
+    :param filecontent: The original file content, used in error messages
+    :param content: The file content with comments blanked out
+    """
+    match = FAST_TOKEN.match
+
+    def expect(pos, group, value=None):
+        return fast_expect(content, pos, group, value)
+
+    m = FAST_FILE_START.match(content)
+    if m is None:
+        raise FastParserUnsupported()
+    pos = expect(m.end(), 2, "HEADER")
+    pos = expect(pos, 7, ";")
+
+    header = {}
+    for name in ("FILE_DESCRIPTION", "FILE_NAME", "FILE_SCHEMA"):
+        pos = expect(pos, 2, name)
+        pos = expect(pos, 7, "(")
+        header[name], pos, _ = fast_parse_parameters(content, pos)
+        pos = expect(pos, 7, ";")
+    pos = expect(pos, 2, "ENDSEC")
+    pos = expect(pos, 7, ";")
+    pos = expect(pos, 2, "DATA")
+    pos = expect(pos, 7, ";")
+
+    ents = defaultdict(list)
+    seen = set()
+    duplicate = None
+
+    # Line numbers are counted incrementally as the content is traversed
+    lineno = 1
+    counted = 0
+
+    def line_at(offset):
+        nonlocal lineno, counted
+        lineno += content.count("\n", counted, offset)
+        counted = offset
+        return lineno
+
+    size = len(content) or 1
+    dots = 0
+
+    while True:
+        m = match(content, pos)
+        if m is None:
+            raise FastParserUnsupported()
+        if m.lastindex != 1:
+            if m.group(2) != "ENDSEC":
+                raise FastParserUnsupported()
+            pos = expect(m.end(), 7, ";")
+            break
+
+        id_ = int(m.group(1))
+        first = line_at(m.start(1))
+        entity_type, attributes, pos, last = fast_parse_record(content, m.end())
+
+        if with_tree:
+            lines = (first, line_at(last))
+            if ents[id_]:
+                duplicate = duplicate or (id_, lines)
+            ents[id_].append(entity_instance(id_, entity_type, attributes, lines))
+        else:
+            if id_ in seen:
+                duplicate = duplicate or (id_, [first, first])
+            seen.add(id_)
+
+        if with_progress:
+            n = pos * 100 // size
+            sys.stdout.write((n - dots) * ".")
+            sys.stdout.flush()
+            dots = n
+
+    if FAST_FILE_END.match(content, pos) is None:
+        raise FastParserUnsupported()
+
+    if duplicate:
+        raise DuplicateNameError(filecontent, *duplicate)
+
+    if not with_tree:
+        return None
+    if with_header:
+        return header, ents
+    else:
+        return ents
+
+
+# A complete statement, up to and including the first semicolon that is
+# not part of a string or comment. Like in parse(), comments are recognised
+# within strings as well.
+STATEMENT = re.compile(
+    r"[^;'/]*(?:(?:'[^'/]*(?:(?:/\*[\s\S]*?\*/|/(?!\*)|'')[^'/]*)*'(?!')"
+    r"|/\*[\s\S]*?\*/|/(?!\*))[^;'/]*)*;"
+)
+COMMENT = re.compile(r"/\*[\s\S]*?\*/")
+
+
+def blank_comments(content):
+    """Replaces the comments in `content` by spaces, preserving line numbers"""
+    return COMMENT.sub(lambda match: re.sub(r"[^\n]", " ", match.group()), content)
+
+
+def iter_statements(f, chunk_size):
+    """Yields the statements read from file object `f` together with the line
+    and column at which they start. Trailing content that is not terminated
+    by a semicolon is yielded last."""
+    buffer = ""
+    pos = 0
+    line, column = 1, 0
+    while True:
+        m = STATEMENT.match(buffer, pos)
+        if m is None:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        text = m.group()
+        yield text, line, column
+        n = text.count("\n")
+        if n:
+            line += n
+            column = len(text) - text.rfind("\n") - 1
+        else:
+            column += len(text)
+        pos = m.end()
+    if buffer[pos:].strip():
+        yield buffer[pos:], line, column
+
+
+def iter_entities(filename, chunk_size=1 << 20):
+    """Yields the entity instances of a file as it is read from disk.
+
+    Memory use does not depend on the size of the file, so this can be used
+    for validation and statistics on files that don't fit in memory. The
+    instances and errors are the same as for `parse()`, but instances are
+    produced before the remainder of the file is read, so an error can be
+    raised after part of the file has been yielded. For duplicate instance
+    names only a bitmap of the names seen is kept.
+
+    :param filename: Path of the STEP file
+    :param chunk_size: Number of characters read at a time
+    """
+    entity_parser = None
+    seen = bytearray()
+
+    def positioned(prefix, text, line, column):
+        # Places text at its line and column in the file, after prefix
+        prefix_line = prefix.count("\n") + 1
+        prefix_column = len(prefix) - prefix.rfind("\n") - 1
+        if line > prefix_line:
+            return prefix + "\n" * (line - prefix_line) + " " * column + text
+        return prefix + " " * max(column - prefix_column, 0) + text
+
+    def diagnose(header, text, line, column, at_end=False):
+        # Reparses the header and offending statement at their original
+        # positions so that the error is reported like parse() does. Unless
+        # the statement is at the end of the file, the end of the data
+        # section is substituted for what follows it.
+        suffix = "" if at_end or not text.endswith(";") else "\nENDSEC;END-ISO-10303-21;"
+        parse(filecontent=positioned(header, text, line, column) + suffix, with_tree=False)
+        raise ValidationError(f"Unable to parse the statement on line {line}")
+
+    def keyword_statement(content):
+        m = FAST_TOKEN.match(content)
+        if m is not None and m.lastindex == 2:
+            m2 = FAST_TOKEN.match(content, m.end())
+            if m2 is not None and m2.group(7) == ";" and not content[m2.end() :].strip(" \t\f\r\n"):
+                return m.group(2)
+
+    with builtins.open(filename, encoding=None) as f:
+        statements = iter_statements(f, chunk_size)
+
+        line, column = 1, 0
+        header = []
+        for text, line, column in statements:
+            header.append(text)
+            if keyword_statement(blank_comments(text)) == "DATA":
+                break
+        header = "".join(header)
+        parse(filecontent=header + "ENDSEC;END-ISO-10303-21;", with_tree=False)
+
+        text = ""
+        for text, line, column in statements:
+            content = blank_comments(text) if "/*" in text else text
+            m = FAST_TOKEN.match(content)
+            if m is None or m.lastindex != 1:
+                if keyword_statement(content) == "ENDSEC":
+                    end = text, line, column
+                    break
+                diagnose(header, text, line, column)
+
+            try:
+                entity_type, attributes, _, last = fast_parse_record(content, m.end())
+                first = line + content.count("\n", 0, m.start(1))
+                ent = entity_instance(
+                    int(m.group(1)),
+                    entity_type,
+                    attributes,
+                    (first, first + content.count("\n", m.start(1), last)),
+                )
+            except FastParserUnsupported:
+                if entity_parser is None:
+                    entity_parser = Lark(grammar, parser="lalr", start="entity_instance")
+                try:
+                    tree = entity_parser.parse(positioned("", blank_comments(text), line, column))
+                except (UnexpectedToken, UnexpectedCharacters):
+                    diagnose(header, text, line, column)
+                ent = create_step_entity(tree)
+
+            byte, bit = divmod(ent.id, 8)
+            if byte >= len(seen):
+                seen.extend(bytes(max(byte + 1 - len(seen), len(seen))))
+            if seen[byte] & (1 << bit):
+                raise DuplicateNameError(positioned("", text, line, column), ent.id, ent.lines)
+            seen[byte] |= 1 << bit
+
+            yield ent
+        else:
+            # end of file before the data section is closed, the error is
+            # reported after the last statement
+            diagnose(header, text, line, column, at_end=True)
+
+        text, line, column = end
+        trailer = "".join(t for t, _, _ in statements)
+        if FAST_FILE_END.match(blank_comments(trailer)) is None:
+            diagnose(header, text + trailer, line, column, at_end=True)
+
+
 def parse(
     *,
     filename=None,
@@ -334,6 +728,7 @@ def parse(
     with_tree=True,
     with_header=False,
     only_header=False,
+    fast=True,
 ):
     if filename:
         assert not filecontent
@@ -342,13 +737,7 @@ def parse(
     if only_header:
         with_header = True
 
-    # Match and remove the comments
-    p = r"/\*[\s\S]*?\*/"
-
-    def replace_fn(match):
-        return re.sub(r"[^\n]", " ", match.group(), flags=re.M)
-
-    filecontent_wo_comments = re.sub(p, replace_fn, filecontent)
+    filecontent_wo_comments = blank_comments(filecontent)
     
         
     if only_header:
@@ -376,6 +765,20 @@ def parse(
         return header
     
 
+    if fast:
+        # The fast parser gives the same outcome as the grammar below, but
+        # defers to it for syntax errors and the constructs it doesn't cover.
+        try:
+            return fast_parse(
+                filecontent,
+                filecontent_wo_comments,
+                with_progress=with_progress,
+                with_tree=with_tree,
+                with_header=with_header,
+            )
+        except FastParserUnsupported:
+            pass
+
     instance_identifiers = []
     transformer = {}
     if not with_tree:
@@ -428,13 +831,58 @@ def parse(
             seen.add(iden)
 
 
+@functools.lru_cache(maxsize=None)
+def get_subtypes(schema_names: tuple[str, ...], type: str) -> tuple[str, ...]:
+    """Return the upper case name of `type` and its subtypes, recursively.
+
+    The schema definitions are taken from ifcopenshell, the first of
+    `schema_names` known to it is used.
+    """
+    import ifcopenshell.ifcopenshell_wrapper
+
+    for name in schema_names:
+        try:
+            schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(name)
+            break
+        except RuntimeError:
+            pass
+    else:
+        raise ValueError(f"Schema {schema_names[0]} not found")
+
+    try:
+        declaration = schema.declaration_by_name(type)
+    except RuntimeError:
+        # not an entity of this schema, only matches the name itself
+        return (type.upper(),)
+
+    def walk(declaration):
+        yield declaration.name().upper()
+        for subtype in declaration.subtypes():
+            yield from walk(subtype)
+
+    return tuple(walk(declaration))
+
+
 class file:
     """
     A somewhat compatible interface (but very limited) to ifcopenshell.file
     """
 
-    def __init__(self, parse_outcomes):
+    def __init__(self, parse_outcomes, filename=None):
         self.header_, self.data_ = parse_outcomes
+        self.filename = filename
+
+        # Instance names partitioned by upper case entity type
+        self.type_index_ = {}
+        for id_, instances in self.data_.items():
+            for ent in instances:
+                if not isinstance(ent.type, str):
+                    # complex entity instances
+                    continue
+                ids = self.type_index_.get(ent.type.upper())
+                if ids is None:
+                    ids = self.type_index_[ent.type.upper()] = array.array("q")
+                ids.append(id_)
 
     @property
     def schema_identifier(self) -> str:
@@ -513,17 +961,31 @@ class file:
             raise RuntimeError(f"Duplicate definition for id {id}")
         return ns[0]
 
-    def by_type(self, type: str) -> list[entity_instance]:
+    def by_type(self, type: str, include_subtypes: bool = False) -> list[entity_instance]:
         """Return IFC objects filtered by IFC Type and wrapped with the entity_instance class.
+
+        :param type: Case insensitive name of the entity
+        :param include_subtypes: Whether to also return instances of the subtypes of `type`.
+            This requires ifcopenshell for the schema definitions.
         :rtype: list[entity_instance]
         """
-        type_lc = type.lower()
-        return list(
-            filter(
-                lambda ent: ent.type.lower() == type_lc,
-                itertools.chain.from_iterable(self.data_.values()),
-            )
-        )
+        if include_subtypes:
+            names = get_subtypes((self.schema_identifier, self.schema), type)
+        else:
+            names = (type.upper(),)
+        return [self.data_[id_][0] for name in names for id_ in self.type_index_.get(name, ())]
+
+    def iter_entities(self) -> Iterator[entity_instance]:
+        """Iterate over the IFC entity instances in file order.
+
+        For a file opened with `only_header=True` the instances are read
+        from disk in chunks, which allows processing files that don't fit
+        in memory.
+        :rtype: Iterator[entity_instance]
+        """
+        if self.data_ or self.filename is None:
+            return itertools.chain.from_iterable(self.data_.values())
+        return iter_entities(self.filename)
 
 
 def open(fn, only_header: bool = False) -> file:
@@ -534,7 +996,7 @@ def open(fn, only_header: bool = False) -> file:
             with_header=True,  # must be True to return the header
             only_header=True,
         )
-        return file((parse_outcomes, defaultdict(list)))  # data section is empty
+        return file((parse_outcomes, defaultdict(list)), fn)  # data section is empty
     else:
         parse_outcomes = parse(
             filename=fn,
@@ -542,4 +1004,4 @@ def open(fn, only_header: bool = False) -> file:
             with_header=True,
             only_header=False,
         )
-        return file(parse_outcomes)
\ No newline at end of file
+        return file(parse_outcomes, fn)
\ No newline at end of file
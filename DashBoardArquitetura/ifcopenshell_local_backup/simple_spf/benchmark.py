@@ -0,0 +1,71 @@
+"""Compares the fast parser against the Lark grammar.
+
+A synthetic file is generated unless a filename is given, e.g.:
+
+    python benchmark.py --entities 20000
+    python benchmark.py fixtures/pass_1.ifc --repeat 3
+"""
+
+import argparse
+import time
+
+try:
+    from . import parse
+except ImportError:  # in case of running module locally
+    from __init__ import parse
+
+
+HEADER = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');
+FILE_NAME('benchmark.ifc','2024-01-01T00:00:00',('simple_spf'),(''),'','','');
+FILE_SCHEMA(('IFC4'));
+ENDSEC;
+DATA;
+"""
+
+
+def create_content(entities):
+    def build():
+        yield HEADER
+        for i in range(1, entities + 1, 4):
+            yield f"#{i}=IFCCARTESIANPOINT(({i * 0.5},{i * 0.25},0.));\n"
+            yield f"#{i + 1}=IFCPOLYLINE((#{i},#{i}));\n"
+            yield f"#{i + 2}=IFCWALL('2AyG2X0sb16Bjd4gQc{i:06d}',$,'Wall ''{i}''',$,$,#{i + 1},$,$,.STANDARD.);\n"
+            yield f"#{i + 3}=IFCPROPERTYSINGLEVALUE('Width',$,IFCLENGTHMEASURE(0.2),*);\n"
+        yield "ENDSEC;\nEND-ISO-10303-21;\n"
+
+    return "".join(build())
+
+
+def measure(filecontent, repeat, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse(filecontent=filecontent, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast parser against the Lark grammar.")
+    parser.add_argument("filename", nargs="?", help="STEP file to parse, a synthetic file is used when omitted.")
+    parser.add_argument("--entities", type=int, default=10000, help="Number of entities in the synthetic file.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs, the best is reported.")
+    args = parser.parse_args()
+
+    if args.filename:
+        with open(args.filename) as f:
+            filecontent = f.read()
+    else:
+        filecontent = create_content(args.entities)
+
+    print(f"{len(filecontent) / 1e6:.2f} MB")
+    for with_tree in (True, False):
+        lark = measure(filecontent, args.repeat, with_tree=with_tree, fast=False)
+        fast = measure(filecontent, args.repeat, with_tree=with_tree, fast=True)
+        print(f"with_tree={with_tree}: lark {lark:.3f}s fast {fast:.3f}s ({lark / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
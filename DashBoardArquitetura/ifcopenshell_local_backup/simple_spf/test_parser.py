@@ -1,7 +1,7 @@
 import glob
 import pytest
 
-from __init__ import parse, open, ValidationError
+from __init__ import parse, open, iter_entities, ValidationError, DuplicateNameError
 from contextlib import nullcontext
 
 
@@ -24,6 +24,76 @@ def test_file_without_tree(file):
         parse(filename=file, with_tree=False)
 
 
+def parse_outcome(**kwargs):
+    try:
+        result = parse(**kwargs)
+    except ValidationError as e:
+        return type(e), str(e)
+    if kwargs.get("with_tree", True):
+        header, data = result
+        return header, {k: [repr(e) + str(e.lines) for e in v] for k, v in data.items()}
+
+
+@pytest.mark.parametrize("file", glob.glob("fixtures/*.ifc"))
+@pytest.mark.parametrize("with_tree", [True, False])
+def test_fast_parser_equivalence(file, with_tree):
+    fast = parse_outcome(filename=file, with_tree=with_tree, with_header=True, fast=True)
+    slow = parse_outcome(filename=file, with_tree=with_tree, with_header=True, fast=False)
+    assert fast == slow
+
+
+CONTENT = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');
+FILE_NAME('','',(''),(''),'','','');
+FILE_SCHEMA(('IFC4'));
+ENDSEC;
+DATA;
+#1=IFCPERSON($,$,'It''s',(),*);
+#2=IFCPROPERTYSINGLEVALUE('\\X2\\00E9\\X0\\',$,IFCLENGTHMEASURE(-1.E-5),
+  .T.);
+#3 = IFCPOLYLINE((#1,(#2,2)));
+ENDSEC;
+END-ISO-10303-21;
+"""
+
+
+def test_fast_parser_content():
+    for fast in (True, False):
+        f = parse(filecontent=CONTENT, fast=fast)
+        assert f[1][0].attributes == [None, None, "It's", (), "*"]
+        assert f[2][0].attributes[2].ifctype == "IFCLENGTHMEASURE"
+        assert f[2][0].attributes[2].value == -1e-5
+        assert f[2][0].lines == (9, 10)
+        assert f[3][0].attributes == [(1, (2, 2))]
+
+    duplicate = CONTENT.replace("#3 =", "#2 =")
+    for fast in (True, False):
+        with pytest.raises(DuplicateNameError) as e:
+            parse(filecontent=duplicate, fast=fast)
+        assert e.value.linenumbers == (11, 11)
+
+    invalid = CONTENT.replace("(),*", "(),,*")
+    assert parse_outcome(filecontent=invalid, fast=True) == parse_outcome(filecontent=invalid, fast=False)
+
+
+def test_iter_entities(tmp_path):
+    fn = tmp_path / "stream.ifc"
+    fn.write_text(CONTENT)
+    expected = [repr(e) + str(e.lines) for v in parse(filecontent=CONTENT).values() for e in v]
+    assert [repr(e) + str(e.lines) for e in iter_entities(fn, chunk_size=16)] == expected
+    assert [repr(e) + str(e.lines) for e in open(fn, only_header=True).iter_entities()] == expected
+
+    fn.write_text(CONTENT.replace("#3 =", "#2 ="))
+    with pytest.raises(DuplicateNameError):
+        list(iter_entities(fn))
+
+    fn.write_text(CONTENT.replace("(),*", "(),,*"))
+    with pytest.raises(ValidationError) as e:
+        list(iter_entities(fn))
+    assert str(e.value) == str(parse_outcome(filecontent=CONTENT.replace("(),*", "(),,*"))[1])
+
+
 def test_parse_features():
     f = open('fixtures/pass_1.ifc')
     assert f.by_id(1).id == 1
@@ -126,3 +196,12 @@ def test_valid_headers(filename):
     # error in body; with_header should not raise an error
     with nullcontext():
         parse(filename=filename, with_tree=False, only_header=True, with_header=True)
+
+
+def test_by_type_index(tmp_path):
+    fn = tmp_path / "index.ifc"
+    fn.write_text(CONTENT)
+    f = open(fn)
+    assert list(f.type_index_["IFCPERSON"]) == [1]
+    assert [e.id for e in f.by_type("IfcPolyline")] == [3]
+    assert f.by_type("IfcWall") == []
@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from ifc_extractor import IFCSteelExtractor
+
+
+TIPOS = ["vigas", "pilares", "lajes", "sapatas", "paredes", "outros"]
+
+
+def criar_registros(extrator, quantidade, semente=0):
+    gerador = random.Random(semente)
+    registros = [
+        {
+            "guid": f"guid{i}",
+            "nome": f"Elemento {i}",
+            "descricao": "",
+            "tipo_ifc": "IfcBeam",
+            "tipo_estrutural": gerador.choice(TIPOS),
+            "pavimento": f"Pavimento {gerador.randint(0, 4)}",
+            # Volume exato, como o de _processar_elemento, antes do arredondamento
+            "volume_concreto": gerador.uniform(0.01, 20),
+        }
+        for i in range(quantidade)
+    ]
+    return list(extrator._aplicar_custos(registros, tamanho_lote=300))
+
+
+@pytest.fixture
+def extrator():
+    return IFCSteelExtractor("inexistente.ifc")
+
+
+@pytest.mark.parametrize("semente", [0, 1, 2])
+def test_colunas_iguais_aos_registros(extrator, semente):
+    registros = criar_registros(extrator, 2000, semente)
+    colunas = extrator.montar_colunas(registros)
+
+    assert np.array_equal(colunas["peso_aco_total"], [r["peso_aco_total"] for r in registros])
+    assert np.array_equal(colunas["custo_concreto"], [r["custo_concreto"]["custo_total"] for r in registros])
+    assert np.array_equal(colunas["custo_armacao"], [r["custo_armacao"]["custo_total"] for r in registros])
+
+
+@pytest.mark.parametrize("semente", [0, 1, 2])
+def test_dashboard_colunar_igual_ao_dos_registros(extrator, semente):
+    registros = criar_registros(extrator, 2000, semente)
+    por_registros = extrator._processar_dados_para_dashboard(registros)
+    por_colunas = extrator._processar_colunas_para_dashboard(extrator.montar_colunas(registros))
+
+    for chave, valor in por_registros["resumo"].items():
+        assert por_colunas["resumo"][chave] == pytest.approx(valor, abs=1e-9)
+    for secao in ("por_pavimento", "por_elemento", "por_bitola"):
+        assert len(por_colunas[secao]) == len(por_registros[secao])
+        for esperado, obtido in zip(por_registros[secao], por_colunas[secao]):
+            assert obtido == pytest.approx(esperado, abs=1e-9)
+
+
+def test_colunas_vazias(extrator):
+    colunas = extrator.montar_colunas([])
+    assert len(colunas["guid"]) == 0
+    assert extrator._processar_colunas_para_dashboard(colunas)["resumo"]["elementos_total"] == 0
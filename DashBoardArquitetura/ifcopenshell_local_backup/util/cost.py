@@ -61,61 +61,183 @@ def calculate_applied_value(
     cost_value: ifcopenshell.entity_instance,
     category_filter: Optional[str] = None,
 ) -> float:
-    if cost_value.ArithmeticOperator and cost_value.Components:
-        component_values = []
-        for component in cost_value.Components:
-            component_values.append(calculate_applied_value(root_element, component, category_filter))
-        if cost_value.ArithmeticOperator == "ADD":
-            return sum(component_values)
-        result = component_values.pop(0)
-        if cost_value.ArithmeticOperator == "DIVIDE":
-            for value in component_values:
-                try:
-                    result /= value
-                except ZeroDivisionError:
-                    pass
-        elif cost_value.ArithmeticOperator == "MULTIPLY":
-            for value in component_values:
-                result *= value
-        elif cost_value.ArithmeticOperator == "SUBTRACT":
-            for value in component_values:
-                result -= value
-        return result
-    if cost_value.Category is None:
-        return get_primitive_applied_value(cost_value.AppliedValue)
-    elif cost_value.Category == "*":
-        if root_element.IsNestedBy:
-            return sum_child_root_elements(root_element)
-        else:
-            return get_primitive_applied_value(cost_value.AppliedValue)
-    elif cost_value.Category:
-        if root_element.IsNestedBy:
-            return sum_child_root_elements(root_element, category_filter=cost_value.Category)
+    return CostEvaluator().calculate_applied_value(root_element, cost_value, category_filter)
+
+
+def sum_child_root_elements(root_element: ifcopenshell.entity_instance, category_filter: Optional[str] = None) -> float:
+    return CostEvaluator().sum_child_root_elements(root_element, category_filter)
+
+
+class CostEvaluator:
+    """Calculates applied values of cost items and construction resources
+
+    Every applied value, category sum and quantity is calculated once and
+    cached, so nested cost items summing the same children are not
+    re-evaluated. Keep an evaluator to reuse results between calls, and
+    call :meth:`invalidate` with whatever was edited in the meantime.
+
+    Example:
+
+    .. code:: python
+
+        evaluator = ifcopenshell.util.cost.CostEvaluator()
+        values = evaluator.evaluate(cost_schedule)
+
+        # Later, after editing a cost value or a quantity
+        evaluator.invalidate(cost_value)
+        values = evaluator.evaluate(cost_schedule)
+    """
+
+    def __init__(self):
+        # Results of each cost item or resource, by id
+        self.applied_values: dict[int, dict[int, float]] = {}
+        self.sums: dict[int, dict[Optional[str], float]] = {}
+        self.quantities: dict[int, Union[float, None]] = {}
+        # What each result was calculated from, to know what to forget on invalidation
+        self.cost_value_roots: dict[int, set[int]] = {}
+        self.quantity_roots: dict[int, set[int]] = {}
+        self.parents: dict[int, set[int]] = {}
+
+    def evaluate(self, cost_schedule: ifcopenshell.entity_instance) -> dict[int, dict[int, float]]:
+        """Calculates all cost items of a schedule, children first
+
+        :param cost_schedule: The IfcCostSchedule.
+        :return: The applied value of each cost value of each cost item, by
+            cost item id then cost value id.
+        """
+        cost_items = list(get_schedule_cost_items(cost_schedule))
+        # Children come after their parents, so reversed they are calculated first
+        for cost_item in reversed(cost_items):
+            for cost_value in cost_item.CostValues or []:
+                self.calculate_applied_value(cost_item, cost_value)
+        return {
+            cost_item.id(): {
+                cost_value.id(): self.calculate_applied_value(cost_item, cost_value)
+                for cost_value in cost_item.CostValues or []
+            }
+            for cost_item in cost_items
+        }
+
+    def invalidate(self, element: ifcopenshell.entity_instance) -> None:
+        """Forgets results depending on an edited element
+
+        Results of the cost items or resources using the element are
+        forgotten, along with those of every parent summing them up.
+
+        :param element: An edited IfcAppliedValue or IfcPhysicalQuantity. An
+            IfcCostItem or IfcConstructionResource may be given if its cost
+            values, quantities or nested children were changed.
+        """
+        if element.is_a("IfcAppliedValue"):
+            root_ids = self.cost_value_roots.pop(element.id(), set())
+        elif element.is_a("IfcPhysicalQuantity"):
+            root_ids = self.quantity_roots.pop(element.id(), set())
         else:
+            root_ids = {element.id()}
+        while root_ids:
+            root_id = root_ids.pop()
+            self.applied_values.pop(root_id, None)
+            self.sums.pop(root_id, None)
+            self.quantities.pop(root_id, None)
+            root_ids.update(self.parents.pop(root_id, ()))
+
+    def calculate_applied_value(
+        self,
+        root_element: ifcopenshell.entity_instance,
+        cost_value: ifcopenshell.entity_instance,
+        category_filter: Optional[str] = None,
+    ) -> float:
+        applied_values = self.applied_values.setdefault(root_element.id(), {})
+        if (result := applied_values.get(cost_value.id())) is None:
+            self.cost_value_roots.setdefault(cost_value.id(), set()).add(root_element.id())
+            result = applied_values[cost_value.id()] = self._calculate_applied_value(
+                root_element, cost_value, category_filter
+            )
+        return result
+
+    def _calculate_applied_value(
+        self,
+        root_element: ifcopenshell.entity_instance,
+        cost_value: ifcopenshell.entity_instance,
+        category_filter: Optional[str] = None,
+    ) -> float:
+        if cost_value.ArithmeticOperator and cost_value.Components:
+            component_values = []
+            for component in cost_value.Components:
+                component_values.append(self.calculate_applied_value(root_element, component, category_filter))
+            if cost_value.ArithmeticOperator == "ADD":
+                return sum(component_values)
+            result = component_values.pop(0)
+            if cost_value.ArithmeticOperator == "DIVIDE":
+                for value in component_values:
+                    try:
+                        result /= value
+                    except ZeroDivisionError:
+                        pass
+            elif cost_value.ArithmeticOperator == "MULTIPLY":
+                for value in component_values:
+                    result *= value
+            elif cost_value.ArithmeticOperator == "SUBTRACT":
+                for value in component_values:
+                    result -= value
+            return result
+        if cost_value.Category is None:
             return get_primitive_applied_value(cost_value.AppliedValue)
-    return 0.0
+        elif cost_value.Category == "*":
+            if root_element.IsNestedBy:
+                return self.sum_child_root_elements(root_element)
+            else:
+                return get_primitive_applied_value(cost_value.AppliedValue)
+        elif cost_value.Category:
+            if root_element.IsNestedBy:
+                return self.sum_child_root_elements(root_element, category_filter=cost_value.Category)
+            else:
+                return get_primitive_applied_value(cost_value.AppliedValue)
+        return 0.0
 
+    def sum_child_root_elements(
+        self, root_element: ifcopenshell.entity_instance, category_filter: Optional[str] = None
+    ) -> float:
+        sums = self.sums.setdefault(root_element.id(), {})
+        if (result := sums.get(category_filter)) is None:
+            result = sums[category_filter] = self._sum_child_root_elements(root_element, category_filter)
+        return result
 
-def sum_child_root_elements(root_element: ifcopenshell.entity_instance, category_filter: Optional[str] = None) -> float:
-    result = 0.0
-    for rel in root_element.IsNestedBy:
-        for child_root_element in rel.RelatedObjects:
+    def _sum_child_root_elements(
+        self, root_element: ifcopenshell.entity_instance, category_filter: Optional[str] = None
+    ) -> float:
+        result = 0.0
+        for rel in root_element.IsNestedBy:
+            for child_root_element in rel.RelatedObjects:
+                self.parents.setdefault(child_root_element.id(), set()).add(root_element.id())
+                if root_element.is_a("IfcCostItem"):
+                    values = child_root_element.CostValues
+                elif root_element.is_a("IfcConstructionResource"):
+                    values = child_root_element.BaseCosts
+                for child_cost_value in values or []:
+                    if category_filter and child_cost_value.Category != category_filter:
+                        continue
+                    child_applied_value = self.calculate_applied_value(child_root_element, child_cost_value)
+                    child_quantity = self.get_total_quantity(child_root_element)
+                    child_quantity = 1.0 if child_quantity is None else child_quantity
+                    if child_cost_value.UnitBasis:
+                        value_component = child_cost_value.UnitBasis.ValueComponent.wrappedValue
+                        result += child_quantity / value_component * child_applied_value
+                    else:
+                        result += child_quantity * child_applied_value
+        return result
+
+    def get_total_quantity(self, root_element: ifcopenshell.entity_instance) -> Union[float, None]:
+        if (root_id := root_element.id()) not in self.quantities:
+            quantities = []
             if root_element.is_a("IfcCostItem"):
-                values = child_root_element.CostValues
-            elif root_element.is_a("IfcConstructionResource"):
-                values = child_root_element.BaseCosts
-            for child_cost_value in values or []:
-                if category_filter and child_cost_value.Category != category_filter:
-                    continue
-                child_applied_value = calculate_applied_value(child_root_element, child_cost_value)
-                child_quantity = get_total_quantity(child_root_element)
-                child_quantity = 1.0 if child_quantity is None else child_quantity
-                if child_cost_value.UnitBasis:
-                    value_component = child_cost_value.UnitBasis.ValueComponent.wrappedValue
-                    result += child_quantity / value_component * child_applied_value
-                else:
-                    result += child_quantity * child_applied_value
-    return result
+                quantities = root_element.CostQuantities or []
+            elif root_element.is_a("IfcConstructionResource") and root_element.BaseQuantity:
+                quantities = [root_element.BaseQuantity]
+            for quantity in quantities:
+                self.quantity_roots.setdefault(quantity.id(), set()).add(root_id)
+            self.quantities[root_id] = get_total_quantity(root_element)
+        return self.quantities[root_id]
 
 
 def serialise_cost_value(cost_value: ifcopenshell.entity_instance) -> str:
@@ -254,10 +376,13 @@ def get_cost_item_assignments(
         return current_assignments + nested_assignments
 
 
-def get_cost_values(cost_item: ifcopenshell.entity_instance) -> list[dict[str, str]]:
+def get_cost_values(
+    cost_item: ifcopenshell.entity_instance, evaluator: Optional[CostEvaluator] = None
+) -> list[dict[str, str]]:
+    evaluator = evaluator or CostEvaluator()
     results = []
     for cost_value in cost_item.CostValues or []:
-        label = "{0:.2f}".format(calculate_applied_value(cost_item, cost_value))
+        label = "{0:.2f}".format(evaluator.calculate_applied_value(cost_item, cost_value))
         label += " = {}".format(serialise_cost_value(cost_value))
         unit_data = {"value_component": None, "unit_component": None, "unit_symbol": ""}
         if cost_value.UnitBasis:
@@ -16,8 +16,11 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import json
+import sqlite3
 from pathlib import Path
+from collections.abc import Mapping, Iterator
 import copy
 import ifcopenshell
 import ifcopenshell.ifcopenshell_wrapper as ifcopenshell_wrapper
@@ -106,31 +109,126 @@ SCHEMA_FILES: dict[SUPPORTED_SCHEMA, dict[str, Path]] = {
     },
 }
 
-db: dict[SUPPORTED_SCHEMA, SchemaData] = None
+# The JSON files are indexed into this SQLite database the first time they are
+# used, so that a lookup only reads the rows it needs. Defaults to __pycache__
+# next to the JSON files.
+DB_CACHE_DIR = os.environ.get("IFCOPENSHELL_DOC_CACHE_DIR")
+
+db: dict[SUPPORTED_SCHEMA, SchemaData] = {}
 schema_by_name: dict[SUPPORTED_SCHEMA, Optional[ifcopenshell_wrapper.schema_definition]] = {
     "IFC2X3": None,
     "IFC4": None,
     "IFC4X3": None,
 }
+index_connection: Optional[sqlite3.Connection] = None
+
+
+def get_index_connection() -> sqlite3.Connection:
+    global index_connection
+    if index_connection is None:
+        directory = Path(DB_CACHE_DIR) if DB_CACHE_DIR else BASE_MODULE_PATH / "schema" / "__pycache__"
+        directory.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(directory / "docs.sqlite", timeout=30, check_same_thread=False)
+        connection.isolation_level = None
+        connection.execute("CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, size INTEGER, mtime INTEGER)")
+        connection.execute("CREATE TABLE IF NOT EXISTS docs (source TEXT, name TEXT, value TEXT, PRIMARY KEY (source, name))")
+        index_connection = connection
+    return index_connection
+
+
+class DocTable(Mapping):
+    """A read-only mapping of names to the documentation in one JSON file
+
+    Entries are read from the SQLite index one at a time, as they are looked
+    up. The index is (re)built from the JSON file when it is first used or
+    when the file has changed since. If the index can't be written, the JSON
+    file is loaded as a whole instead.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.source = path.name
+        self.connection: Optional[sqlite3.Connection] = None
+        self.data: Optional[dict[str, Any]] = None
+        self.cache: dict[str, Any] = {}
+
+    def get_connection(self) -> Optional[sqlite3.Connection]:
+        if self.connection is None and self.data is None:
+            try:
+                self.connection = self.index()
+            except (OSError, sqlite3.Error):
+                with open(self.path, "r") as fi:
+                    self.data = json.load(fi)
+        return self.connection
+
+    def index(self) -> sqlite3.Connection:
+        connection = get_index_connection()
+        stat = self.path.stat()
+        key = (stat.st_size, stat.st_mtime_ns)
+        query = "SELECT size, mtime FROM sources WHERE source = ?"
+        if connection.execute(query, (self.source,)).fetchone() == key:
+            return connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have indexed the file while waiting for the lock
+            if connection.execute(query, (self.source,)).fetchone() != key:
+                with open(self.path, "r") as fi:
+                    data = json.load(fi)
+                connection.execute("DELETE FROM docs WHERE source = ?", (self.source,))
+                connection.executemany(
+                    "INSERT INTO docs VALUES (?, ?, ?)",
+                    ((self.source, name, json.dumps(value)) for name, value in data.items()),
+                )
+                connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (self.source, *key))
+            connection.execute("COMMIT")
+        except:
+            connection.execute("ROLLBACK")
+            raise
+        return connection
+
+    def __getitem__(self, name: str) -> Any:
+        if (value := self.cache.get(name)) is not None:
+            return value
+        if (connection := self.get_connection()) is None:
+            return self.data[name]
+        row = connection.execute(
+            "SELECT value FROM docs WHERE source = ? AND name = ?", (self.source, name)
+        ).fetchone()
+        if row is None:
+            raise KeyError(name)
+        value = self.cache[name] = json.loads(row[0])
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        if (connection := self.get_connection()) is None:
+            return iter(self.data)
+        rows = connection.execute("SELECT name FROM docs WHERE source = ? ORDER BY rowid", (self.source,))
+        return (name for (name,) in rows.fetchall())
+
+    def __len__(self) -> int:
+        if (connection := self.get_connection()) is None:
+            return len(self.data)
+        return connection.execute("SELECT COUNT(*) FROM docs WHERE source = ?", (self.source,)).fetchone()[0]
+
+    def __contains__(self, name: object) -> bool:
+        if name in self.cache:
+            return True
+        return super().__contains__(name)
 
 
 def get_db(version: ifcopenshell.util.schema.IFC_SCHEMA) -> Union[SchemaData, None]:
-    global db
-    if not db:
-        db = {ifc_version: dict() for ifc_version in SCHEMA_FILES}
-        for ifc_version in SCHEMA_FILES:
-            for data_type in SCHEMA_FILES[ifc_version]:
-                schema_path = SCHEMA_FILES[ifc_version][data_type]
-                if not schema_path.is_file():
-                    print(f"Schema file {schema_path} wasn't found.")
-                    files_missing = True
-                    continue
-
-                with open(schema_path, "r") as fi:
-                    db[ifc_version][data_type] = json.load(fi)
-
     version = ifcopenshell.util.schema.get_fallback_schema(version)
-    return db.get(version)
+    if version not in SCHEMA_FILES:
+        return None
+    if version not in db:
+        # only the tables of the requested schema are set up, their contents are read on demand
+        db[version] = {}
+        for data_type, schema_path in SCHEMA_FILES[version].items():
+            if not schema_path.is_file():
+                print(f"Schema file {schema_path} wasn't found.")
+                continue
+            db[version][data_type] = DocTable(schema_path)
+    return db[version]
 
 
 def get_schema_by_name(version: str) -> ifcopenshell_wrapper.schema_definition:
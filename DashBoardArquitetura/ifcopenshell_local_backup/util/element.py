@@ -16,14 +16,19 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import sys
+import tempfile
 import ifcopenshell
 import ifcopenshell.guid
 import ifcopenshell.util.element
 import ifcopenshell.util.representation
 from typing import Any, Callable, Optional, Union, Literal, overload
-from collections.abc import Generator, Sequence
+from collections.abc import Generator, Iterable, Sequence
 from collections import namedtuple
 
+# ignore_cleanup_errors requires Python 3.10
+TEMPORARY_DIRECTORY_SETTINGS = {} if sys.version_info < (3, 10) else {"ignore_cleanup_errors": True}
 
 MATERIAL_TYPE = Literal[
     "IfcMaterial",
@@ -221,6 +226,130 @@ def get_psets(
     return psets
 
 
+def get_psets_many(
+    elements: Iterable[ifcopenshell.entity_instance],
+    psets_only=False,
+    qtos_only=False,
+    should_inherit=True,
+    verbose=False,
+) -> dict[ifcopenshell.entity_instance, dict[str, dict[str, Any]]]:
+    """Retrieve the property sets of many elements at once
+
+    This gives the same results as calling :func:`get_psets` on each element,
+    but every property definition is only read once. This is much faster when
+    many elements share a type or share property sets, as the properties
+    inherited from a type are resolved once for all of its occurrences.
+
+    Note that to avoid copying, property dictionaries which are not overridden
+    by an occurrence are shared between elements. Copy them before modifying
+    them.
+
+    :param elements: The IFC elements
+    :param psets_only: Default as False. Set to true if only property sets are needed.
+    :param qtos_only: Default as False. Set to true if only quantities are needed.
+    :param should_inherit: Default as True. Set to false if you don't want to inherit property sets from the Type.
+    :param verbose: More detailed prop values, defaults to False.
+    :return: A dictionary of each element to its psets' names and their
+        properties' names & values
+
+    Example:
+
+    .. code:: python
+
+        walls = ifc_file.by_type("IfcWall")
+        for wall, psets in ifcopenshell.util.element.get_psets_many(walls).items():
+            print(wall, psets.get("Pset_WallCommon", {}).get("FireRating"))
+    """
+    definitions: dict[int, tuple[str, dict[str, Any]]] = {}
+    type_psets: dict[int, dict[str, dict[str, Any]]] = {}
+
+    def get_definition(definition: ifcopenshell.entity_instance) -> Optional[tuple[str, dict[str, Any]]]:
+        if psets_only and not definition.is_a("IfcPropertySet"):
+            return
+        if qtos_only and not definition.is_a("IfcElementQuantity"):
+            return
+        if (result := definitions.get(definition.id())) is None:
+            result = definitions[definition.id()] = (
+                definition.Name,
+                get_property_definition(definition, verbose=verbose),
+            )
+        return result
+
+    def merge(psets: dict[str, dict[str, Any]], name: str, props: dict[str, Any]) -> None:
+        if name in psets:
+            psets[name] = psets[name] | props
+        else:
+            psets[name] = props
+
+    def get_type_psets(element_type: ifcopenshell.entity_instance) -> dict[str, dict[str, Any]]:
+        if (psets := type_psets.get(element_type.id())) is None:
+            psets = type_psets[element_type.id()] = {}
+            for definition in element_type.HasPropertySets or []:
+                if result := get_definition(definition):
+                    merge(psets, *result)
+        return psets
+
+    results = {}
+    for element in elements:
+        if element.is_a("IfcTypeObject"):
+            results[element] = get_type_psets(element).copy()
+        elif (is_defined_by := getattr(element, "IsDefinedBy", None)) is None:
+            # Materials and profiles don't share definitions, so there is nothing to reuse.
+            results[element] = get_psets(element, psets_only, qtos_only, should_inherit, verbose)
+        else:
+            psets = {}
+            if should_inherit:
+                if element_type := get_type(element):
+                    psets = get_type_psets(element_type).copy()
+            for relationship in is_defined_by:
+                if relationship.is_a("IfcRelDefinesByProperties"):
+                    if result := get_definition(relationship.RelatingPropertyDefinition):
+                        merge(psets, *result)
+            results[element] = psets
+    return results
+
+
+def get_psets_columns(
+    elements: Sequence[ifcopenshell.entity_instance],
+    psets_only=False,
+    qtos_only=False,
+    should_inherit=True,
+) -> dict[tuple[str, str], list[Any]]:
+    """Retrieve the properties of many elements as columns
+
+    This is convenient to load properties into a table, such as a pandas
+    ``DataFrame``. Each column holds one value per element, in the same order
+    as the elements, or None if the element doesn't have that property. The
+    internal pset "id" is not included.
+
+    :param elements: The IFC elements
+    :param psets_only: Default as False. Set to true if only property sets are needed.
+    :param qtos_only: Default as False. Set to true if only quantities are needed.
+    :param should_inherit: Default as True. Set to false if you don't want to inherit property sets from the Type.
+    :return: A dictionary of (pset name, property name) to a list of values
+
+    Example:
+
+    .. code:: python
+
+        walls = ifc_file.by_type("IfcWall")
+        columns = ifcopenshell.util.element.get_psets_columns(walls)
+        df = pandas.DataFrame(columns, index=[w.GlobalId for w in walls])
+    """
+    columns: dict[tuple[str, str], list[Any]] = {}
+    total = len(elements)
+    psets_many = get_psets_many(elements, psets_only, qtos_only, should_inherit)
+    for i, element in enumerate(elements):
+        for pset_name, props in psets_many[element].items():
+            for prop_name, value in props.items():
+                if prop_name == "id":
+                    continue
+                if (column := columns.get((pset_name, prop_name))) is None:
+                    column = columns[(pset_name, prop_name)] = [None] * total
+                column[i] = value
+    return columns
+
+
 @overload
 def get_property_definition(
     definition: Optional[ifcopenshell.entity_instance], prop: None = None, verbose=False
@@ -1480,8 +1609,10 @@ def batch_remove_deep2(ifc_file: ifcopenshell.file) -> None:
     many elements (>10000), it is faster to serialise the IFC, remove elements
     using string replacement, and then reload the modified serialised IFC.
 
-    The trade-off is that extra memory will be used, and string replacement
-    only works with remove_deep2 where the removed elements have no inverses.
+    The serialisation is streamed to disk and filtered line by line, so no
+    copy of it is held in memory. Use unbatch_remove_deep2_to_file to only
+    write the result to disk without reloading it. Filtering lines only works
+    with remove_deep2 where the removed elements have no inverses.
     In addition, transaction history will be lost, and any scripts using this
     method will have to refetch elements from the reloaded IFC and cannot rely
     on existing variables in memory.
@@ -1506,33 +1637,69 @@ def batch_remove_deep2(ifc_file: ifcopenshell.file) -> None:
     ifc_file.to_delete = set()
 
 
-def unbatch_remove_deep2(ifc_file: ifcopenshell.file) -> ifcopenshell.file:
+@overload
+def unbatch_remove_deep2(ifc_file: ifcopenshell.file, return_count: Literal[False] = False) -> ifcopenshell.file: ...
+@overload
+def unbatch_remove_deep2(ifc_file: ifcopenshell.file, return_count: Literal[True]) -> tuple[ifcopenshell.file, int]: ...
+def unbatch_remove_deep2(
+    ifc_file: ifcopenshell.file, return_count: bool = False
+) -> Union[ifcopenshell.file, tuple[ifcopenshell.file, int]]:
     """Finish removing elements batched from remove_deep2 using string replacement
 
     See documentation for batch_remove_deep2.
 
     :param ifc_file: The IFC file object
-    :return: A newly loaded file with the elements removed.
+    :param return_count: If true, also return the number of entities removed,
+        as returned by unbatch_remove_deep2_to_file.
+    :return: A newly loaded file with the elements removed, or a tuple of
+        that file and the number of entities removed if return_count is true.
+
+    Example:
+
+    .. code:: python
+
+        model, total_removed = ifcopenshell.util.element.unbatch_remove_deep2(model, return_count=True)
+    """
+    with tempfile.TemporaryDirectory(**TEMPORARY_DIRECTORY_SETTINGS) as directory:
+        path = os.path.join(directory, "unbatched.ifc")
+        total_removed = unbatch_remove_deep2_to_file(ifc_file, path)
+        new_file = ifcopenshell.open(path)
+    if return_count:
+        return new_file, total_removed
+    return new_file
+
+
+def unbatch_remove_deep2_to_file(ifc_file: ifcopenshell.file, path: str) -> int:
+    """Finish removing elements batched from remove_deep2 by writing a new file
+
+    The model is written to a temporary file first, which is then copied line
+    by line to path, leaving out the removed elements. Unlike
+    unbatch_remove_deep2 the result is not loaded, so this is what to use when
+    the model only needs to be saved.
+
+    See documentation for batch_remove_deep2.
+
+    :param ifc_file: The IFC file object
+    :param path: The .ifc filepath to write the result to
+    :return: The number of entities removed.
     """
     assert ifc_file.to_delete is not None
-    ifc_string = ifc_file.to_string()
-    lines = iter(ifc_string.split("\n"))
-    ids_to_delete = iter(sorted([e.id() for e in ifc_file.to_delete]))
-    id_to_delete = next(ids_to_delete, None)
-    result: list[str] = []
-
-    for line in lines:
-        if id_to_delete is None:
-            result.append(line)
-            continue
-
-        if line.startswith(f"#{id_to_delete}="):
-            id_to_delete = next(ids_to_delete, None)
-        else:
-            result.append(line)
+    ids_to_delete = {e.id() for e in ifc_file.to_delete}
+    total_removed = 0
+
+    with tempfile.TemporaryDirectory(**TEMPORARY_DIRECTORY_SETTINGS) as directory:
+        unfiltered_path = os.path.join(directory, "unfiltered.ifc")
+        ifc_file.write(unfiltered_path, format=".ifc")
+        with open(unfiltered_path, "rb") as source, open(path, "wb") as destination:
+            for line in source:
+                # Every entity instance is serialised on a line of its own, as #id=...
+                if line.startswith(b"#") and int(line[1 : line.index(b"=")]) in ids_to_delete:
+                    total_removed += 1
+                else:
+                    destination.write(line)
 
     ifc_file.to_delete = None
-    return ifcopenshell.file.from_string("\n".join(result))
+    return total_removed
 
 
 def remove_deep2(
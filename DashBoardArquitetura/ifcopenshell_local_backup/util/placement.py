@@ -122,6 +122,106 @@ def get_local_placement(placement: Optional[ifcopenshell.entity_instance] = None
     return np.dot(parent, get_axis2placement(placement.RelativePlacement))
 
 
+class PlacementCache:
+    """Resolves local placements once and reuses them between elements
+
+    Many elements share the same chain of parent placements (e.g. storey,
+    building, site). :func:`get_local_placement` recomputes the whole chain for
+    every element, whereas this cache stores the absolute matrix of every
+    ``IfcLocalPlacement`` it resolves, keyed by placement ID.
+
+    The cache is cleared automatically when new entities are created, or when
+    a transaction is recorded, undone or redone. Other edits made outside of a
+    transaction (e.g. changing a coordinate in place) can't be detected, so
+    call :meth:`clear` after them.
+
+    Example:
+
+    .. code:: python
+
+        cache = ifcopenshell.util.placement.PlacementCache(model)
+        matrix = cache.get_local_placement(wall.ObjectPlacement)
+        matrices = cache.get_local_placements(model.by_type("IfcWall"))
+    """
+
+    def __init__(self, ifc_file: ifcopenshell.file):
+        self.file = ifc_file
+        self.matrices: dict[int, MatrixType] = {}
+        self.file_state = self.get_file_state()
+
+    def get_file_state(self) -> tuple:
+        history = getattr(self.file, "history", None)
+        future = getattr(self.file, "future", None)
+        transaction = getattr(self.file, "transaction", None)
+        return (
+            self.file.wrapped_data.getMaxId(),
+            history[-1] if history else None,
+            len(future) if future else 0,
+            transaction,
+            len(transaction.operations) if transaction else 0,
+        )
+
+    def clear(self) -> None:
+        """Discards all cached matrices"""
+        self.matrices = {}
+        self.file_state = self.get_file_state()
+
+    def validate(self) -> None:
+        """Clears the cache if the file has changed since it was filled"""
+        if (file_state := self.get_file_state()) != self.file_state:
+            self.matrices = {}
+            self.file_state = file_state
+
+    def get_local_placement(self, placement: Optional[ifcopenshell.entity_instance] = None) -> MatrixType:
+        """Parse a local placement into a 4x4 transformation matrix
+
+        This gives the same result as :func:`get_local_placement`. The
+        returned matrix is shared with the cache and must not be modified.
+
+        :param placement: The IfcLocalPlacement entity
+        :return: A 4x4 numpy matrix
+        """
+        self.validate()
+        return self._get_local_placement(placement)
+
+    def get_local_placements(self, elements: Iterable[ifcopenshell.entity_instance]) -> npt.NDArray[np.float64]:
+        """Get the placement matrices of many elements at once
+
+        Elements without an ``ObjectPlacement`` get an identity matrix.
+
+        :param elements: The IfcProduct elements
+        :return: A numpy array of 4x4 matrices. Array shape: (n, 4, 4).
+        """
+        self.validate()
+        elements = list(elements)
+        result = np.empty((len(elements), 4, 4))
+        for i, element in enumerate(elements):
+            result[i] = self._get_local_placement(getattr(element, "ObjectPlacement", None))
+        return result
+
+    def _get_local_placement(self, placement: Optional[ifcopenshell.entity_instance]) -> MatrixType:
+        if placement is None:
+            return np.eye(4)
+        if (matrix := self.matrices.get(placement.id())) is not None:
+            return matrix
+
+        # Walk up until a cached or root placement is reached, then resolve
+        # back down so that every placement in the chain is cached.
+        chain = []
+        parent = np.eye(4)
+        while placement is not None:
+            if (matrix := self.matrices.get(placement.id())) is not None:
+                parent = matrix
+                break
+            chain.append(placement)
+            placement = placement.PlacementRelTo
+
+        for placement in reversed(chain):
+            parent = np.dot(parent, get_axis2placement(placement.RelativePlacement))
+            self.matrices[placement.id()] = parent
+        return parent
+
+
 def get_cartesiantransformationoperator3d(inst: ifcopenshell.entity_instance) -> MatrixType:
     """Parses an IfcCartesianTransformationOperator into a 4x4 transformation matrix
 
@@ -0,0 +1,121 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark the vectorised ifcopenshell.util.shape.get_volume against the
+previous pure Python implementation.
+
+Closed meshes (UV spheres) are generated synthetically so no IFC file is
+needed. Example::
+
+    python benchmark_get_volume.py --triangles 100000 --batch 1000
+"""
+
+
+import argparse
+import timeit
+from dataclasses import dataclass
+
+import numpy as np
+import ifcopenshell.util.shape
+
+
+@dataclass
+class Mesh:
+    """Minimal stand-in for the triangulation output of ifcopenshell.geom."""
+
+    verts: tuple[float, ...]
+    faces: tuple[int, ...]
+    verts_buffer: bytes
+    faces_buffer: bytes
+
+
+def create_sphere(triangles: int, radius: float = 1.0) -> Mesh:
+    rings = max(2, int((triangles / 2) ** 0.5))
+    segments = max(3, triangles // (2 * rings))
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    body = np.stack((np.sin(t) * np.cos(p), np.sin(t) * np.sin(p), np.cos(t)), axis=-1).reshape(-1, 3)
+    verts = np.vstack(([0.0, 0.0, 1.0], body, [0.0, 0.0, -1.0])) * radius
+    bottom = len(verts) - 1
+
+    faces = []
+    for j in range(segments):
+        k = (j + 1) % segments
+        faces.append((0, 1 + j, 1 + k))
+        faces.append((bottom, 1 + (rings - 2) * segments + k, 1 + (rings - 2) * segments + j))
+        for i in range(rings - 2):
+            a, b = 1 + i * segments + j, 1 + i * segments + k
+            c, d = a + segments, b + segments
+            faces.append((a, c, d))
+            faces.append((a, d, b))
+    verts = verts.astype("d")
+    faces = np.array(faces, dtype="i")
+    return Mesh(tuple(verts.ravel().tolist()), tuple(faces.ravel().tolist()), verts.tobytes(), faces.tobytes())
+
+
+def get_volume_python(geometry: Mesh) -> float:
+    """The previous implementation of get_volume, kept as the baseline."""
+
+    def signed_triangle_volume(p1, p2, p3):
+        v321 = p3[0] * p2[1] * p1[2]
+        v231 = p2[0] * p3[1] * p1[2]
+        v312 = p3[0] * p1[1] * p2[2]
+        v132 = p1[0] * p3[1] * p2[2]
+        v213 = p2[0] * p1[1] * p3[2]
+        v123 = p1[0] * p2[1] * p3[2]
+        return (1.0 / 6.0) * (-v321 + v231 + v312 - v132 - v213 + v123)
+
+    verts = geometry.verts
+    faces = geometry.faces
+    grouped_verts = [[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)]
+    volumes = [
+        signed_triangle_volume(grouped_verts[faces[i]], grouped_verts[faces[i + 1]], grouped_verts[faces[i + 2]])
+        for i in range(0, len(faces), 3)
+    ]
+    return abs(sum(volumes))
+
+
+def report(name: str, baseline: float, optimised: float) -> None:
+    print(f"{name}: python {baseline * 1000:.2f} ms, numpy {optimised * 1000:.2f} ms, {baseline / optimised:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--triangles", type=int, default=100_000, help="Triangles in the large mesh")
+    parser.add_argument("--batch", type=int, default=1_000, help="Number of small meshes in the batch")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    mesh = create_sphere(args.triangles)
+    expected = get_volume_python(mesh)
+    assert np.isclose(ifcopenshell.util.shape.get_volume(mesh), expected)
+    baseline = min(timeit.repeat(lambda: get_volume_python(mesh), number=1, repeat=args.repeat))
+    optimised = min(timeit.repeat(lambda: ifcopenshell.util.shape.get_volume(mesh), number=1, repeat=args.repeat))
+    report(f"Single mesh ({len(mesh.faces) // 3} triangles)", baseline, optimised)
+
+    meshes = [create_sphere(200, radius=1.0 + i / args.batch) for i in range(args.batch)]
+    expected = [get_volume_python(m) for m in meshes]
+    assert np.allclose(ifcopenshell.util.shape.get_volumes(meshes), expected)
+    baseline = min(timeit.repeat(lambda: [get_volume_python(m) for m in meshes], number=1, repeat=args.repeat))
+    optimised = min(timeit.repeat(lambda: ifcopenshell.util.shape.get_volumes(meshes), number=1, repeat=args.repeat))
+    report(f"Batch of {args.batch} meshes", baseline, optimised)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@
 
 import re
 import sys
+import math
 import lark
 import numpy as np
 import ifcopenshell.api.pset
@@ -35,8 +36,9 @@ import ifcopenshell.util.shape
 import ifcopenshell.util.system
 import ifcopenshell.util.unit
 from decimal import Decimal
-from typing import Optional, Any, Union
-from collections.abc import Iterable
+from functools import lru_cache
+from typing import Optional, Any, Union, Callable
+from collections.abc import Hashable, Iterable
 
 if sys.version_info >= (3, 10):
     from types import EllipsisType
@@ -284,6 +286,17 @@ class GetElementTransformer(lark.Transformer):
         return args[1:-1].replace("\\", "")
 
 
+@lru_cache(maxsize=512)
+def parse_filter_query(query: str) -> lark.Tree:
+    """Parse a filter query, reusing the parse tree of previously seen queries
+
+    :param query: Query to parse, as used by :func:`filter_elements`
+    :return: The parsed query tree. It is shared between calls, so it must not
+        be modified.
+    """
+    return filter_elements_grammar.parse(query)
+
+
 def format(query: str) -> str:
     return FormatTransformer().transform(format_grammar.parse(query))
 
@@ -427,6 +440,7 @@ def filter_elements(
     query: str,
     elements: Optional[set[ifcopenshell.entity_instance]] = None,
     edit_in_place=False,
+    index: Optional["FilterIndex"] = None,
 ) -> set[ifcopenshell.entity_instance]:
     """
     Filter elements based on the provided `query`.
@@ -438,6 +452,11 @@ def filter_elements(
         applied to this set of elements, so the result will be a subset of
         elements.
     :param edit_in_place: If `True`, mutate the provided `elements` in place. Defaults to `False`
+    :param index: A :class:`FilterIndex` of the file. If provided, type,
+        material, classification, location, group and property facets are
+        answered from its prebuilt indexes instead of being evaluated on
+        every element, which is much faster when running many queries on
+        the same model.
     :return: Set of filtered elements
 
     Example:
@@ -455,16 +474,130 @@ def filter_elements(
 
         # {#1=IfcWall(...), #2=IfcDoor(...)}
         print(elements)
+
+        # Reuse indexes between queries on the same model.
+        index = ifcopenshell.util.selector.FilterIndex(ifc_file)
+        walls = ifcopenshell.util.selector.filter_elements(ifc_file, "IfcWall, material=Concrete", index=index)
+        slabs = ifcopenshell.util.selector.filter_elements(ifc_file, "IfcSlab, material=Concrete", index=index)
     """
     if not query:
         return elements or set()
     if elements and not edit_in_place:
         elements = elements.copy()
-    transformer = FacetTransformer(ifc_file, elements)
-    transformer.transform(filter_elements_grammar.parse(query))
+    transformer = FacetTransformer(ifc_file, elements, index)
+    transformer.transform(parse_filter_query(query))
     return transformer.get_results()
 
 
+class FilterIndex:
+    """Inverted indexes of a model used to speed up :func:`filter_elements`
+
+    Each index groups the elements of the model (all IfcProducts and
+    IfcTypeProducts) by the value a facet looks at, such as the type name, the
+    material names or the property values. A facet is then evaluated once per
+    distinct value rather than once per element. Indexes are built lazily the
+    first time a facet needs them.
+
+    The index is a snapshot of the model. If the model is edited, call
+    :meth:`clear` before running further queries.
+    """
+
+    def __init__(self, ifc_file: ifcopenshell.file):
+        self.file = ifc_file
+        self.clear()
+
+    def clear(self) -> None:
+        """Discards all indexes so that they are rebuilt on next use"""
+        self.elements: Optional[set[ifcopenshell.entity_instance]] = None
+        self.groups: dict[str, dict[Hashable, set[ifcopenshell.entity_instance]]] = {}
+        self.properties: Optional[dict[tuple[str, str], dict[Hashable, set[ifcopenshell.entity_instance]]]] = None
+        self.property_elements: dict[tuple[str, str], set[ifcopenshell.entity_instance]] = {}
+        self.unindexed_properties: set[tuple[str, str]] = set()
+
+    def get_elements(self) -> set[ifcopenshell.entity_instance]:
+        """Get all the elements covered by the indexes"""
+        if self.elements is None:
+            self.elements = set(self.file.by_type("IfcProduct"))
+            self.elements.update(self.file.by_type("IfcTypeProduct"))
+        return self.elements
+
+    def get_groups(
+        self, facet: str, get_key: Callable[[ifcopenshell.entity_instance], Hashable]
+    ) -> dict[Hashable, set[ifcopenshell.entity_instance]]:
+        """Get the elements grouped by the key a facet is evaluated on
+
+        :param facet: Name of the facet, used to cache the groups
+        :param get_key: Function returning the hashable key of an element
+        :return: Dictionary of key to the elements sharing that key
+        """
+        if (groups := self.groups.get(facet)) is None:
+            groups = self.groups[facet] = {}
+            for element in self.get_elements():
+                groups.setdefault(get_key(element), set()).add(element)
+        return groups
+
+    def get_property_groups(self, pset: str, prop: str) -> Optional[dict[Hashable, set[ifcopenshell.entity_instance]]]:
+        """Get the elements grouped by the value of a property
+
+        Elements without the property or with a null value are not included.
+
+        :param pset: Name of the property set or quantity set
+        :param prop: Name of the property or quantity
+        :return: Dictionary of value key (see :meth:`get_hashable_value`) to
+            the elements with that value, or None if the property has values
+            that cannot be indexed (e.g. complex quantities).
+        """
+        if self.properties is None:
+            self.build_property_index()
+        if (pset, prop) in self.unindexed_properties:
+            return None
+        return self.properties.get((pset, prop), {})
+
+    def get_property_elements(self, pset: str, prop: str) -> set[ifcopenshell.entity_instance]:
+        """Get all the elements that have a non-null value for a property"""
+        if (elements := self.property_elements.get((pset, prop))) is None:
+            elements = self.property_elements[(pset, prop)] = set()
+            for group in (self.get_property_groups(pset, prop) or {}).values():
+                elements |= group
+        return elements
+
+    def build_property_index(self) -> None:
+        self.properties = {}
+        for element, psets in ifcopenshell.util.element.get_psets_many(self.get_elements()).items():
+            for pset, props in psets.items():
+                for prop, value in props.items():
+                    key = (pset, prop)
+                    if value is None or prop == "id" or key in self.unindexed_properties:
+                        continue
+                    try:
+                        value = self.get_hashable_value(value)
+                        self.properties.setdefault(key, {}).setdefault(value, set()).add(element)
+                    except TypeError:
+                        self.unindexed_properties.add(key)
+                        self.properties.pop(key, None)
+
+    def get_hashable_value(self, value: Any) -> Hashable:
+        """Get the key a property value is indexed by
+
+        The key includes the type of the value, so values which are equal but
+        compare differently in a query, such as 1, 1.0 and True, are kept in
+        separate groups. Use :meth:`get_value` to get the value back.
+
+        :raises TypeError: If the value cannot be hashed
+        """
+        if isinstance(value, list):
+            return (list, tuple(self.get_hashable_value(v) for v in value))
+        hash(value)
+        return (type(value), value)
+
+    def get_value(self, key: Hashable) -> Any:
+        """Get the property value of a key from :meth:`get_hashable_value`"""
+        value_type, value = key
+        if value_type is list:
+            return [self.get_value(v) for v in value]
+        return value
+
+
 class SetElementValueException(Exception): ...
 
 
@@ -761,10 +894,18 @@ class FacetTransformer(lark.Transformer):
     base_elements: Optional[set[ifcopenshell.entity_instance]]
     elements: set[ifcopenshell.entity_instance]
     container_trees: dict[ifcopenshell.entity_instance, list[ifcopenshell.entity_instance]]
-
-    def __init__(self, ifc_file: ifcopenshell.file, elements: Optional[set[ifcopenshell.entity_instance]] = None):
+    filters: list[tuple[float, Callable[[set[ifcopenshell.entity_instance]], set[ifcopenshell.entity_instance]]]]
+
+    def __init__(
+        self,
+        ifc_file: ifcopenshell.file,
+        elements: Optional[set[ifcopenshell.entity_instance]] = None,
+        index: Optional[FilterIndex] = None,
+    ):
         self.file = ifc_file
+        self.index = index
         self.results = []
+        self.filters = []
         if elements is None:
             self.base_elements = None
             self.elements = set()
@@ -790,13 +931,57 @@ class FacetTransformer(lark.Transformer):
             results |= r
         return results
 
+    def add_filter(
+        self,
+        test: Callable[[Any], bool],
+        get_key: Callable[[ifcopenshell.entity_instance], Any],
+        facet: Optional[str] = None,
+    ) -> None:
+        """Queue a facet which keeps the elements whose key passes the test
+
+        Filtering facets only remove elements, so consecutive ones can be
+        applied in any order. They are queued and applied by
+        :meth:`apply_filters`, most selective first. If an index is available
+        and the facet is indexable, the test is evaluated once per distinct key
+        instead of once per element.
+        """
+        self.add_default_elements()
+        if self.index is None or facet is None:
+            self.filters.append((math.inf, lambda elements: {e for e in elements if test(get_key(e))}))
+            return
+        matches: set[ifcopenshell.entity_instance] = set()
+        for key, group in self.index.get_groups(facet, get_key).items():
+            if test(key):
+                matches |= group
+        self.add_indexed_filter(matches, lambda e: test(get_key(e)))
+
+    def add_indexed_filter(
+        self, matches: set[ifcopenshell.entity_instance], filter_function: Callable[[ifcopenshell.entity_instance], bool]
+    ) -> None:
+        indexed_elements = self.index.get_elements()
+
+        def apply(elements: set[ifcopenshell.entity_instance]) -> set[ifcopenshell.entity_instance]:
+            # Elements outside of the index (e.g. a custom base set) are tested directly.
+            return (elements & matches) | set(filter(filter_function, elements - indexed_elements))
+
+        self.filters.append((len(matches), apply))
+
+    def apply_filters(self) -> None:
+        for _, apply in sorted(self.filters, key=lambda f: f[0]):
+            if not self.elements:
+                break
+            self.elements = apply(self.elements)
+        self.filters = []
+
     def facet_list(self, args):
+        self.apply_filters()
         if self.elements:
             self.results.append(self.elements)
             self.elements = set()
             self.has_additive_facet_in_current_list = False
 
     def instance(self, args):
+        self.apply_filters()
         self.has_additive_facet_in_current_list = True
         if self.base_elements is None:
             if args[0].data == "globalid":
@@ -820,6 +1005,7 @@ class FacetTransformer(lark.Transformer):
                 }
 
     def entity(self, args):
+        self.apply_filters()
         self.has_additive_facet_in_current_list = True
         if self.base_elements is None:
             if args[0].data == "ifc_class":
@@ -842,43 +1028,40 @@ class FacetTransformer(lark.Transformer):
         name, comparison, value = args
         name = name.children[0].value
 
-        def filter_function(element: ifcopenshell.entity_instance) -> bool:
+        def get_key(element: ifcopenshell.entity_instance) -> Any:
             if name == "PredefinedType":
-                element_value = ifcopenshell.util.element.get_predefined_type(element)
-            else:
-                element_value = getattr(element, name, None)
-            return self.compare(element_value, comparison, value)
+                return ifcopenshell.util.element.get_predefined_type(element)
+            return getattr(element, name, None)
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        self.add_filter(lambda key: self.compare(key, comparison, value), get_key)
 
     def type(self, args):
         comparison, value = args
 
-        def filter_function(element: ifcopenshell.entity_instance) -> bool:
-            element_value = getattr(ifcopenshell.util.element.get_type(element), "Name", None)
-            return self.compare(element_value, comparison, value)
+        def get_key(element: ifcopenshell.entity_instance) -> Optional[str]:
+            return getattr(ifcopenshell.util.element.get_type(element), "Name", None)
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        self.add_filter(lambda key: self.compare(key, comparison, value), get_key, "type")
 
     def material(self, args):
         comparison, value = args
 
-        def filter_function(element: ifcopenshell.entity_instance) -> bool:
+        def get_key(element: ifcopenshell.entity_instance) -> tuple[tuple[Optional[str], Optional[str]], ...]:
             materials = ifcopenshell.util.element.get_materials(element)
+            return tuple((material.Name, getattr(material, "Category", None)) for material in materials)
+
+        def test(materials: tuple[tuple[Optional[str], Optional[str]], ...]) -> bool:
             result = False if materials else None
-            for material in materials:
-                if self.compare(material.Name, comparison, value):
+            for name, category in materials:
+                if self.compare(name, comparison, value):
                     result = True
-                if self.compare(getattr(material, "Category", None), comparison, value):
+                if self.compare(category, comparison, value):
                     result = True
             if result is not None:
                 return result if comparison == "=" else not result
             return self.compare(None, comparison, value)
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        self.add_filter(test, get_key, "material")
 
     def property(self, args):
         pset, prop, comparison, value = args
@@ -907,61 +1090,85 @@ class FacetTransformer(lark.Transformer):
                                 return self.compare(element_value, comparison, value)
             return self.compare(None, comparison, value)
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        if self.index is not None and isinstance(pset, str) and isinstance(prop, str) and prop != "id":
+            groups = self.index.get_property_groups(pset, prop)
+            if groups is not None:
+                self.add_default_elements()
+                matches: set[ifcopenshell.entity_instance] = set()
+                for key, group in groups.items():
+                    if self.compare(self.index.get_value(key), comparison, value):
+                        matches |= group
+                if self.compare(None, comparison, value):
+                    matches |= self.index.get_elements() - self.index.get_property_elements(pset, prop)
+                self.add_indexed_filter(matches, filter_function)
+                return
+
+        self.add_filter(filter_function, lambda element: element)
 
     def classification(self, args):
         comparison, value = args
 
-        def filter_function(element: ifcopenshell.entity_instance) -> bool:
+        def get_key(element: ifcopenshell.entity_instance) -> tuple[tuple[Optional[str], Optional[str]], ...]:
             references = ifcopenshell.util.classification.get_references(element)
+            return tuple(
+                (
+                    reference.Name,
+                    getattr(reference, "Identification", getattr(reference, "ItemReference", None)),
+                )
+                for reference in references
+            )
+
+        def test(references: tuple[tuple[Optional[str], Optional[str]], ...]) -> bool:
             result = False if references else None
-            for reference in references:
-                if self.compare(reference.Name, comparison, value):
+            for name, identification in references:
+                if self.compare(name, comparison, value):
                     result = True
-                if self.compare(
-                    getattr(reference, "Identification", getattr(reference, "ItemReference", None)), comparison, value
-                ):
+                if self.compare(identification, comparison, value):
                     result = True
             if result is not None:
                 return result if comparison == "=" else not result
             return self.compare(None, comparison, value)
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        self.add_filter(test, get_key, "classification")
 
     def location(self, args):
         comparison, value = args
 
-        def filter_function(element: ifcopenshell.entity_instance) -> bool:
+        def get_key(element: ifcopenshell.entity_instance) -> tuple[Optional[str], ...]:
             container = ifcopenshell.util.element.get_container(element)
             if not container:
                 container = ifcopenshell.util.element.get_aggregate(element)
-            containers = self.get_container_tree(container)
-            result = False if containers else None
-            for container in containers:
-                if self.compare(container.Name, "=", value):
+            return tuple(container.Name for container in self.get_container_tree(container))
+
+        def test(container_names: tuple[Optional[str], ...]) -> bool:
+            result = False if container_names else None
+            for name in container_names:
+                if self.compare(name, "=", value):
                     result = True
             if result is not None:
                 return result if comparison == "=" else not result
             return self.compare(None, comparison, value)
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        self.add_filter(test, get_key, "location")
 
     def group(self, args):
         comparison, value = args
 
-        def filter_function(element: ifcopenshell.entity_instance) -> bool:
+        def get_key(element: ifcopenshell.entity_instance) -> tuple[Optional[str], ...]:
+            return tuple(
+                rel.RelatingGroup.Name
+                for rel in getattr(element, "HasAssignments", [])
+                if rel.is_a("IfcRelAssignsToGroup") and rel.RelatingGroup
+            )
+
+        def test(group_names: tuple[Optional[str], ...]) -> bool:
             result = False
-            for rel in getattr(element, "HasAssignments", []):
-                if rel.is_a("IfcRelAssignsToGroup") and rel.RelatingGroup:
-                    if self.compare(rel.RelatingGroup.Name, "=", value):
-                        result = True
+            for name in group_names:
+                if self.compare(name, "=", value):
+                    result = True
             return result if comparison == "=" else not result
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        self.add_filter(test, get_key, "group")
 
     def parent(self, args):
         comparison, value = args
@@ -1003,9 +1210,9 @@ class FacetTransformer(lark.Transformer):
 
         self.add_default_elements()
         if comparison == "=":
-            self.elements = self.elements & children
+            self.filters.append((len(children), lambda elements: elements & children))
         else:
-            self.elements -= children
+            self.filters.append((math.inf, lambda elements: elements - children))
 
     def query(self, args):
         keys, comparison, value = args
@@ -1013,8 +1220,7 @@ class FacetTransformer(lark.Transformer):
         def filter_function(element: ifcopenshell.entity_instance) -> bool:
             return self.compare(get_element_value(element, keys), comparison, value)
 
-        self.add_default_elements()
-        self.elements = set(filter(filter_function, self.elements))
+        self.add_filter(filter_function, lambda element: element)
 
     def get_container_tree(self, container: ifcopenshell.entity_instance) -> list[ifcopenshell.entity_instance]:
         tree: Union[list[ifcopenshell.entity_instance], None]
@@ -18,7 +18,8 @@
 
 import datetime
 import ifcopenshell.util.date
-from math import floor
+from math import ceil, floor
+from bisect import bisect_left
 from functools import cache
 from typing import Union, Literal, Optional
 from collections.abc import Iterator
@@ -93,18 +94,13 @@ def get_calendar(task: ifcopenshell.entity_instance) -> Union[ifcopenshell.entit
 
 
 def count_working_days(start, finish, calendar: ifcopenshell.entity_instance) -> int:
-    result = 0
     if start == finish:
         return 0
     current_date = datetime.date(start.year, start.month, start.day)
     finish_date = datetime.date(finish.year, finish.month, finish.day)
-    while current_date <= finish_date:
-        if calendar and calendar.WorkingTimes and is_working_day(current_date, calendar):
-            result += 1
-        elif not calendar or not is_calendar_applicable(current_date, calendar):
-            result += 1
-        current_date += datetime.timedelta(days=1)
-    return result
+    if current_date > finish_date:
+        return 0
+    return compile_calendar(calendar).count(current_date, finish_date)
 
 
 def get_start_or_finish_date(
@@ -136,39 +132,187 @@ def offset_date(start, duration, duration_type: DURATION_TYPE, calendar: ifcopen
     months = getattr(duration, "months", 0)
     years = getattr(duration, "years", 0)
 
-    abs_duration = abs(duration.days + months * 30 + years * 12 * 30)
-    date_offset = datetime.timedelta(days=1 if duration.days > 0 else -1)
-    while abs_duration > 0:
-        if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(current_date, calendar):
-            abs_duration -= 1
-        elif is_working_day(current_date, calendar):
-            abs_duration -= 1
-        current_date += date_offset
-    if duration.days > 0:
-        current_date = get_soonest_working_day(current_date, duration_type, calendar)
+    # Each step counts one day, so a fractional duration still takes a whole day
+    abs_duration = ceil(abs(duration.days + months * 30 + years * 12 * 30))
+    if duration_type == "ELAPSEDTIME":
+        days = abs_duration if duration.days > 0 else -abs_duration
+    elif duration.days > 0:
+        days = compile_calendar(calendar).offset_after(current_date, abs_duration)
     else:
-        current_date = get_recent_working_day(current_date, duration_type, calendar)
-    return current_date
+        days = compile_calendar(calendar).offset_before(current_date, abs_duration)
+    return current_date + datetime.timedelta(days=days)
 
 
 def get_soonest_working_day(start, duration_type: DURATION_TYPE, calendar: ifcopenshell.entity_instance):
-    if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(start, calendar):
+    if duration_type == "ELAPSEDTIME":
         return start
-    while not is_working_day(start, calendar):
-        if not is_calendar_applicable(start, calendar):
-            break
-        start += datetime.timedelta(days=1)
-    return start
+    return start + datetime.timedelta(days=compile_calendar(calendar).offset_after(start, 0))
 
 
 def get_recent_working_day(start, duration_type: DURATION_TYPE, calendar: ifcopenshell.entity_instance):
-    if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(start, calendar):
+    if duration_type == "ELAPSEDTIME":
         return start
-    while not is_working_day(start, calendar):
-        if not is_calendar_applicable(start, calendar):
-            break
-        start -= datetime.timedelta(days=1)
-    return start
+    return start + datetime.timedelta(days=compile_calendar(calendar).offset_before(start, 0))
+
+
+# The parts of a day that each recurrence type depends on, see is_recurrence_applicable_to_day
+RECURRENCE_DAY_KEYS = {
+    None: lambda day: None,
+    "DAILY": lambda day: None,
+    "WEEKLY": lambda day: day.weekday(),
+    "MONTHLY_BY_DAY_OF_MONTH": lambda day: day.day,
+    "MONTHLY_BY_POSITION": lambda day: (day.weekday(), floor(day.day / 7)),
+    "YEARLY_BY_DAY_OF_MONTH": lambda day: (day.month, day.day),
+    "YEARLY_BY_POSITION": lambda day: (day.month, day.weekday(), floor(day.day / 7)),
+}
+
+
+class CompiledCalendar:
+    """Working days of a work calendar, precomputed as cumulative counts
+
+    A day is counted if it is a working day or if the calendar does not apply
+    to it at all, which is how offsets and durations are measured. Each day
+    is evaluated once and the covered range grows on demand, so counting and
+    offsetting become lookups in :attr:`counts` instead of walking day by day.
+
+    Compiled calendars are cached by :func:`compile_calendar` and have to be
+    cleared whenever the calendar is edited.
+    """
+
+    #: Searching for a counted day gives up past this many days (about 200 years)
+    MAX_DAYS = 73050
+
+    def __init__(self, calendar: Optional[ifcopenshell.entity_instance]):
+        self.working_times = []
+        self.exception_times = []
+        if calendar and calendar.WorkingTimes:
+            self.working_times = [self.compile_work_time(w) for w in calendar.WorkingTimes]
+            self.exception_times = [self.compile_work_time(w) for w in calendar.ExceptionTimes or []]
+        self.first_day: Optional[datetime.date] = None
+        # counts[i] is the number of counted days from first_day up to, not including, first_day + i
+        self.counts = [0]
+
+    def compile_work_time(self, work_time: ifcopenshell.entity_instance) -> tuple:
+        recurrence = work_time.RecurrencePattern
+        get_key = RECURRENCE_DAY_KEYS.get(recurrence.RecurrenceType if recurrence else None, lambda day: day)
+        return (work_time, *get_work_time_range(work_time), get_key, {})
+
+    def is_counted(self, day: datetime.date) -> bool:
+        is_applicable = False
+        for entry in self.working_times:
+            if is_day_in_range(day, entry[1], entry[2]):
+                is_applicable = True
+                if self.is_recurring(entry, day):
+                    break
+        else:
+            return not is_applicable
+        for entry in self.exception_times:
+            if is_day_in_range(day, entry[1], entry[2]) and self.is_recurring(entry, day):
+                return False
+        return True
+
+    def is_recurring(self, entry: tuple, day: datetime.date) -> bool:
+        work_time, _, _, get_key, results = entry
+        if (key := get_key(day)) not in results:
+            results[key] = is_recurrence_applicable_to_day(work_time, day)
+        return results[key]
+
+    def count(self, start: datetime.date, finish: datetime.date) -> int:
+        """Number of counted days from start to finish, both inclusive"""
+        if not self.working_times:
+            return (finish - start).days + 1
+        self.cover(start, finish)
+        return self.counts[self.index(finish) + 1] - self.counts[self.index(start)]
+
+    def offset_after(self, day, total: int) -> int:
+        """Days from a day to the next counted day once total days are counted
+
+        Counting starts on the day itself and moves forwards.
+        """
+        if not self.working_times:
+            return total
+        start = current = datetime.date(day.year, day.month, day.day)
+        if total:
+            current = self.count_forward(current, total) + datetime.timedelta(days=1)
+        return (self.count_forward(current, 1) - start).days
+
+    def offset_before(self, day, total: int) -> int:
+        """Days from a day to the previous counted day once total days are counted
+
+        Counting starts on the day itself and moves backwards.
+        """
+        if not self.working_times:
+            return -total
+        start = current = datetime.date(day.year, day.month, day.day)
+        if total:
+            current = self.count_backward(current, total) - datetime.timedelta(days=1)
+        return (self.count_backward(current, 1) - start).days
+
+    def index(self, day: datetime.date) -> int:
+        return (day - self.first_day).days
+
+    def count_forward(self, day: datetime.date, total: int) -> datetime.date:
+        """The day on which total days are counted, counting forwards from a day"""
+        self.cover(day, day)
+        i = self.index(day)
+        target = self.counts[i] + total
+        while self.counts[-1] < target:
+            self.extend_after(self.get_growth())
+        return self.first_day + datetime.timedelta(days=bisect_left(self.counts, target, i) - 1)
+
+    def count_backward(self, day: datetime.date, total: int) -> datetime.date:
+        """The day on which total days are counted, counting backwards from a day"""
+        self.cover(day, day)
+        while self.counts[self.index(day) + 1] < total:
+            self.extend_before(self.get_growth())
+        end = self.index(day) + 1
+        i = bisect_left(self.counts, self.counts[end] - total + 1, 0, end)
+        return self.first_day + datetime.timedelta(days=i - 1)
+
+    def cover(self, start: datetime.date, finish: datetime.date) -> None:
+        if self.first_day is None:
+            self.first_day = start
+        if start < self.first_day:
+            self.extend_before(max((self.first_day - start).days, len(self.counts) - 1, 366))
+        if (n := self.index(finish) + 2 - len(self.counts)) > 0:
+            self.extend_after(max(n, len(self.counts) - 1, 366))
+
+    def get_growth(self) -> int:
+        size = len(self.counts) - 1
+        if size >= self.MAX_DAYS:
+            raise ValueError(f"No working day found within {self.MAX_DAYS} days, the work calendar may be empty")
+        return min(max(size, 366), self.MAX_DAYS - size)
+
+    def extend_after(self, n: int) -> None:
+        day = self.first_day + datetime.timedelta(days=len(self.counts) - 1)
+        total = self.counts[-1]
+        for _ in range(n):
+            total += self.is_counted(day)
+            self.counts.append(total)
+            day += datetime.timedelta(days=1)
+
+    def extend_before(self, n: int) -> None:
+        day = self.first_day - datetime.timedelta(days=n)
+        counts = [0]
+        for _ in range(n):
+            counts.append(counts[-1] + self.is_counted(day))
+            day += datetime.timedelta(days=1)
+        total = counts[-1]
+        counts.extend(c + total for c in self.counts[1:])
+        self.counts = counts
+        self.first_day -= datetime.timedelta(days=n)
+
+
+@cache
+def compile_calendar(calendar: Optional[ifcopenshell.entity_instance]) -> CompiledCalendar:
+    """Returns the compiled working days of a calendar
+
+    The result is cached, call ``compile_calendar.cache_clear()`` after
+    editing a calendar.
+
+    :param calendar: IfcWorkCalendar, or None if no calendar applies.
+    """
+    return CompiledCalendar(calendar)
 
 
 @cache
@@ -200,29 +344,36 @@ def is_calendar_applicable(day, calendar: ifcopenshell.entity_instance) -> bool:
 
 
 def is_day_in_work_time(day, work_time: ifcopenshell.entity_instance) -> bool:
-    is_day_in_work_time = True
     if isinstance(day, datetime.datetime):
         day = datetime.date(day.year, day.month, day.day)
-    # 4 IfcWorktime Start
-    if start := work_time[4]:
-        start = ifcopenshell.util.date.ifc2datetime(start)
-        if day > start:
-            is_day_in_work_time = True
-        else:
-            is_day_in_work_time = False
-    # 5 IfcWorktime Finish
-    if finish := work_time[5]:
-        finish = ifcopenshell.util.date.ifc2datetime(finish)
-        if day < finish:
-            is_day_in_work_time = True
-        else:
-            is_day_in_work_time = False
-    return is_day_in_work_time
+    return is_day_in_range(day, *get_work_time_range(work_time))
+
+
+def get_work_time_range(
+    work_time: ifcopenshell.entity_instance,
+) -> tuple[Optional[datetime.date], Optional[datetime.date]]:
+    # 4 IfcWorktime Start, 5 IfcWorktime Finish
+    start = ifcopenshell.util.date.ifc2datetime(start) if (start := work_time[4]) else None
+    finish = ifcopenshell.util.date.ifc2datetime(finish) if (finish := work_time[5]) else None
+    return start, finish
+
+
+def is_day_in_range(day: datetime.date, start: Optional[datetime.date], finish: Optional[datetime.date]) -> bool:
+    is_day_in_range = True
+    if start:
+        is_day_in_range = day > start
+    if finish:
+        is_day_in_range = day < finish
+    return is_day_in_range
 
 
 def is_work_time_applicable_to_day(work_time: ifcopenshell.entity_instance, day) -> bool:
     if not is_day_in_work_time(day, work_time):
         return False
+    return is_recurrence_applicable_to_day(work_time, day)
+
+
+def is_recurrence_applicable_to_day(work_time: ifcopenshell.entity_instance, day) -> bool:
     if not work_time.RecurrencePattern:
         return True
 